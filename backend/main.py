@@ -1,18 +1,55 @@
-from src.features.agents.services import elevenlabs_service
-from fastapi import FastAPI
+import logging
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from src.features.auth.router import router as auth_router
 from src.features.agents.router import voice_router, agent_router
 from src.features.polling.router import router as polling_router
 from src.features.integrations.router import router as integrations_router
 from src.features.abandoned_cart.router import router as abandoned_cart_router
+from src.features.agents.services.elevenlabs_service import elevenlabs_service
+from src.core.database import warm_up_database
+from src.core.supabase_client import close_supabase_clients
+from src.services.abandoned_cart_service import AbandonedCartAgentService
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Establish the database connection before serving traffic
+    await warm_up_database()
+    app.state.abandoned_cart_service = AbandonedCartAgentService()
+    yield
+    # Close pooled HTTP clients held by the service singletons
+    await app.state.abandoned_cart_service.aclose()
+    await elevenlabs_service.aclose()
+    close_supabase_clients()
+
 
 app = FastAPI(
     title="Team AI Backend API",
     description="Backend API for Team AI business registration and management",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
+
+# Registered before CORSMiddleware so error responses still get CORS headers
+@app.middleware("http")
+async def unhandled_exception_middleware(request: Request, call_next):
+    """Return uncaught endpoint errors as a JSON 500 response"""
+    try:
+        return await call_next(request)
+    except Exception as exc:
+        logger.exception("Unhandled error on %s %s", request.method, request.url.path)
+        return ORJSONResponse(
+            status_code=500,
+            content={"detail": f"Failed to process {request.url.path}: {str(exc)}"},
+        )
+
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -0,0 +1,14 @@
+-- Bootstrap: executes a whole migration script server-side in one transaction
+CREATE OR REPLACE FUNCTION public.exec_migration(script text)
+RETURNS void
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+    EXECUTE script;
+END;
+$$;
+
+-- Runs arbitrary SQL as the owner, so only the service role may call it
+REVOKE EXECUTE ON FUNCTION public.exec_migration(text) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.exec_migration(text) TO service_role;
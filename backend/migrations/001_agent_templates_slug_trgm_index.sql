@@ -0,0 +1,5 @@
+-- Trigram index so substring slug searches (ILIKE '%car-rental%') can use an index
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS agent_templates_slug_trgm_idx
+    ON public.agent_templates USING gin (slug gin_trgm_ops);
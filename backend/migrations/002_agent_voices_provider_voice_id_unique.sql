@@ -0,0 +1,31 @@
+-- One row per provider voice so voice syncs can upsert on (provider, voice_id)
+
+-- Collapse existing duplicates onto the oldest row, repointing references first
+CREATE TEMP TABLE agent_voice_duplicates ON COMMIT DROP AS
+SELECT id, keep_id
+FROM (
+    SELECT
+        id,
+        first_value(id) OVER (
+            PARTITION BY provider, voice_id ORDER BY created_at, id
+        ) AS keep_id
+    FROM public.agent_voices
+) ranked
+WHERE id <> keep_id;
+
+UPDATE public.company_agents ca
+SET selected_voice_id = d.keep_id
+FROM agent_voice_duplicates d
+WHERE ca.selected_voice_id = d.id;
+
+UPDATE public.agent_templates t
+SET default_voice_id = d.keep_id
+FROM agent_voice_duplicates d
+WHERE t.default_voice_id = d.id;
+
+DELETE FROM public.agent_voices v
+USING agent_voice_duplicates d
+WHERE v.id = d.id;
+
+ALTER TABLE public.agent_voices
+    ADD CONSTRAINT agent_voices_provider_voice_id_key UNIQUE (provider, voice_id);
@@ -0,0 +1,32 @@
+-- Flattened read views so the API no longer reshapes nested PostgREST embeds
+
+CREATE OR REPLACE VIEW public.v_company_agents_flat
+WITH (security_invoker = true) AS
+SELECT
+    ca.*,
+    t.name AS template_name,
+    t.slug AS template_slug,
+    t.description AS template_description,
+    t.agent_type,
+    t.icon,
+    t.capabilities,
+    t.requires_voice,
+    s.name AS sector_name,
+    s.slug AS sector_slug,
+    v.name AS voice_name,
+    v.provider AS voice_provider
+FROM public.company_agents ca
+JOIN public.agent_templates t ON t.id = ca.agent_template_id
+JOIN public.sectors s ON s.id = t.sector_id
+LEFT JOIN public.agent_voices v ON v.id = ca.selected_voice_id;
+
+CREATE OR REPLACE VIEW public.v_agent_templates_flat
+WITH (security_invoker = true) AS
+SELECT
+    t.*,
+    s.name AS sector_name,
+    s.slug AS sector_slug,
+    v.name AS default_voice_name
+FROM public.agent_templates t
+JOIN public.sectors s ON s.id = t.sector_id
+LEFT JOIN public.agent_voices v ON v.id = t.default_voice_id;
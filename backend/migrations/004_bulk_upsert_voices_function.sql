@@ -0,0 +1,41 @@
+-- Set-based voice upsert so a whole sync batch is one statement server-side
+CREATE OR REPLACE FUNCTION public.bulk_upsert_voices(payload jsonb)
+RETURNS integer
+LANGUAGE sql
+AS $$
+    WITH upserted AS (
+        INSERT INTO public.agent_voices (
+            name, provider, voice_id, language, gender, age_group, accent,
+            sample_url, is_premium, is_active, metadata
+        )
+        SELECT
+            name, provider, voice_id, language, gender, age_group, accent,
+            sample_url, is_premium, is_active, metadata
+        FROM jsonb_to_recordset(payload) AS x(
+            name varchar,
+            provider varchar,
+            voice_id varchar,
+            language varchar,
+            gender varchar,
+            age_group varchar,
+            accent varchar,
+            sample_url text,
+            is_premium boolean,
+            is_active boolean,
+            metadata jsonb
+        )
+        ON CONFLICT (provider, voice_id) DO UPDATE SET
+            name = EXCLUDED.name,
+            language = EXCLUDED.language,
+            gender = EXCLUDED.gender,
+            age_group = EXCLUDED.age_group,
+            accent = EXCLUDED.accent,
+            sample_url = EXCLUDED.sample_url,
+            is_premium = EXCLUDED.is_premium,
+            is_active = EXCLUDED.is_active,
+            metadata = EXCLUDED.metadata,
+            updated_at = now()
+        RETURNING 1
+    )
+    SELECT count(*)::integer FROM upserted;
+$$;
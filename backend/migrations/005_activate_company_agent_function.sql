@@ -0,0 +1,79 @@
+-- One agent row per company and template so activation can be a single upsert
+
+-- Collapse existing duplicates onto the oldest row, repointing references first
+CREATE TEMP TABLE company_agent_duplicates ON COMMIT DROP AS
+SELECT id, keep_id
+FROM (
+    SELECT
+        id,
+        first_value(id) OVER (
+            PARTITION BY company_id, agent_template_id ORDER BY created_at, id
+        ) AS keep_id
+    FROM public.company_agents
+) ranked
+WHERE id <> keep_id;
+
+UPDATE public.agent_integration_links l
+SET agent_id = d.keep_id
+FROM company_agent_duplicates d
+WHERE l.agent_id = d.id;
+
+DELETE FROM public.company_agents ca
+USING company_agent_duplicates d
+WHERE ca.id = d.id;
+
+ALTER TABLE public.company_agents
+    ADD CONSTRAINT company_agents_company_id_agent_template_id_key
+    UNIQUE (company_id, agent_template_id);
+
+-- Creates the agent, or reactivates it keeping existing values for fields the
+-- caller left empty. Configuration is reset; integrations are written after.
+CREATE OR REPLACE FUNCTION public.activate_company_agent(
+    p_company_id uuid,
+    p_agent_template_id uuid,
+    p_config jsonb DEFAULT '{}'::jsonb
+)
+RETURNS SETOF public.company_agents
+LANGUAGE sql
+AS $$
+    INSERT INTO public.company_agents AS ca (
+        company_id,
+        agent_template_id,
+        is_active,
+        is_configured,
+        activated_at,
+        custom_name,
+        custom_prompt,
+        selected_voice_id,
+        language,
+        configuration,
+        monthly_limit,
+        daily_limit
+    )
+    VALUES (
+        p_company_id,
+        p_agent_template_id,
+        true,
+        true,
+        now(),
+        NULLIF(p_config->>'custom_name', ''),
+        NULLIF(p_config->>'custom_prompt', ''),
+        NULLIF(p_config->>'selected_voice_id', '')::uuid,
+        COALESCE(NULLIF(p_config->>'language', ''), 'en-US'),
+        '{}'::jsonb,
+        NULLIF(p_config->>'monthly_limit', '')::integer,
+        NULLIF(p_config->>'daily_limit', '')::integer
+    )
+    ON CONFLICT (company_id, agent_template_id) DO UPDATE SET
+        is_active = true,
+        is_configured = true,
+        activated_at = now(),
+        custom_name = COALESCE(NULLIF(p_config->>'custom_name', ''), ca.custom_name),
+        custom_prompt = COALESCE(NULLIF(p_config->>'custom_prompt', ''), ca.custom_prompt),
+        selected_voice_id = COALESCE(
+            NULLIF(p_config->>'selected_voice_id', '')::uuid, ca.selected_voice_id
+        ),
+        language = COALESCE(NULLIF(p_config->>'language', ''), ca.language),
+        configuration = '{}'::jsonb
+    RETURNING *;
+$$;
@@ -0,0 +1,19 @@
+-- One row per credential key so credential saves can upsert on (configuration_id, credential_key)
+
+-- Keep the most recently written value of any duplicated key
+DELETE FROM public.integration_credentials c
+USING (
+    SELECT
+        id,
+        row_number() OVER (
+            PARTITION BY configuration_id, credential_key
+            ORDER BY updated_at DESC NULLS LAST, created_at DESC NULLS LAST, id
+        ) AS rank
+    FROM public.integration_credentials
+) ranked
+WHERE c.id = ranked.id
+  AND ranked.rank > 1;
+
+ALTER TABLE public.integration_credentials
+    ADD CONSTRAINT integration_credentials_configuration_id_credential_key_key
+    UNIQUE (configuration_id, credential_key);
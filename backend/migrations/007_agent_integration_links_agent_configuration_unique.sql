@@ -0,0 +1,29 @@
+-- One link per agent and configuration so linking can upsert on (agent_id, configuration_id)
+
+-- Keep the oldest link of each pair, enabled if any duplicate was
+UPDATE public.agent_integration_links l
+SET is_enabled = true
+FROM (
+    SELECT agent_id, configuration_id
+    FROM public.agent_integration_links
+    GROUP BY agent_id, configuration_id
+    HAVING count(*) > 1 AND bool_or(is_enabled)
+) enabled
+WHERE l.agent_id = enabled.agent_id
+  AND l.configuration_id = enabled.configuration_id;
+
+DELETE FROM public.agent_integration_links l
+USING (
+    SELECT
+        id,
+        row_number() OVER (
+            PARTITION BY agent_id, configuration_id ORDER BY created_at, id
+        ) AS rank
+    FROM public.agent_integration_links
+) ranked
+WHERE l.id = ranked.id
+  AND ranked.rank > 1;
+
+ALTER TABLE public.agent_integration_links
+    ADD CONSTRAINT agent_integration_links_agent_id_configuration_id_key
+    UNIQUE (agent_id, configuration_id);
@@ -0,0 +1,79 @@
+-- Store the integration summary during activation instead of a second write
+-- from the API. References embed the agent id, so they are filled in here.
+DROP FUNCTION IF EXISTS public.activate_company_agent(uuid, uuid, jsonb);
+
+CREATE OR REPLACE FUNCTION public.activate_company_agent(
+    p_company_id uuid,
+    p_agent_template_id uuid,
+    p_config jsonb DEFAULT '{}'::jsonb,
+    p_integrations jsonb DEFAULT NULL
+)
+RETURNS SETOF public.company_agents
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_agent public.company_agents;
+BEGIN
+    INSERT INTO public.company_agents AS ca (
+        company_id,
+        agent_template_id,
+        is_active,
+        is_configured,
+        activated_at,
+        custom_name,
+        custom_prompt,
+        selected_voice_id,
+        language,
+        configuration,
+        monthly_limit,
+        daily_limit
+    )
+    VALUES (
+        p_company_id,
+        p_agent_template_id,
+        true,
+        true,
+        now(),
+        NULLIF(p_config->>'custom_name', ''),
+        NULLIF(p_config->>'custom_prompt', ''),
+        NULLIF(p_config->>'selected_voice_id', '')::uuid,
+        COALESCE(NULLIF(p_config->>'language', ''), 'en-US'),
+        '{}'::jsonb,
+        NULLIF(p_config->>'monthly_limit', '')::integer,
+        NULLIF(p_config->>'daily_limit', '')::integer
+    )
+    ON CONFLICT (company_id, agent_template_id) DO UPDATE SET
+        is_active = true,
+        is_configured = true,
+        activated_at = now(),
+        custom_name = COALESCE(NULLIF(p_config->>'custom_name', ''), ca.custom_name),
+        custom_prompt = COALESCE(NULLIF(p_config->>'custom_prompt', ''), ca.custom_prompt),
+        selected_voice_id = COALESCE(
+            NULLIF(p_config->>'selected_voice_id', '')::uuid, ca.selected_voice_id
+        ),
+        language = COALESCE(NULLIF(p_config->>'language', ''), ca.language),
+        configuration = '{}'::jsonb
+    RETURNING * INTO v_agent;
+
+    IF p_integrations IS NOT NULL AND p_integrations <> '{}'::jsonb THEN
+        UPDATE public.company_agents
+        SET configuration = jsonb_build_object(
+            'integrations',
+            (
+                SELECT jsonb_object_agg(
+                    provider_slug,
+                    summary || jsonb_build_object(
+                        'configuration_reference',
+                        'agent_' || v_agent.id || '_provider_' || provider_slug
+                    )
+                )
+                FROM jsonb_each(p_integrations) AS s(provider_slug, summary)
+            )
+        )
+        WHERE id = v_agent.id
+        RETURNING * INTO v_agent;
+    END IF;
+
+    RETURN NEXT v_agent;
+END;
+$$;
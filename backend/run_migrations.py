@@ -4,11 +4,14 @@ Database Migration Runner
 Runs SQL migration files in order and tracks migration history
 """
 
+import asyncio
+import hashlib
 import os
 import sys
 from pathlib import Path
-from supabase import create_client, Client
+from supabase import Client
 from dotenv import load_dotenv
+from src.core.supabase_client import create_supabase_client
 
 # Load environment variables
 load_dotenv()
@@ -22,11 +25,18 @@ if not url or not service_key:
     )
     sys.exit(1)
 
-supabase: Client = create_client(url, service_key)
+supabase: Client = create_supabase_client(url, service_key)
 
 # Migration directory
 MIGRATIONS_DIR = Path(__file__).parent / "migrations"
 
+# Installs the exec_migration() function every other migration runs through
+BOOTSTRAP_MIGRATION = "000_exec_migration_function.sql"
+
+# Files whose first line is "-- @parallel-group: <name>" may run concurrently
+# with adjacent files declaring the same group
+PARALLEL_GROUP_DIRECTIVE = "-- @parallel-group:"
+
 
 def create_migrations_table():
     """Create table to track migration history"""
@@ -71,88 +81,98 @@ def get_executed_migrations():
 
 def calculate_checksum(content):
     """Calculate simple checksum for migration content"""
-    import hashlib
-
     return hashlib.md5(content.encode()).hexdigest()
 
 
-def execute_migration_file(filepath):
-    """Execute a single migration file"""
+def get_parallel_group(filepath):
+    """Return the parallel group declared on the first line of a migration file"""
+    with open(filepath, "r", encoding="utf-8") as f:
+        first_line = f.readline().strip()
+
+    if first_line.startswith(PARALLEL_GROUP_DIRECTIVE):
+        return first_line[len(PARALLEL_GROUP_DIRECTIVE) :].strip() or None
+    return None
+
+
+def plan_migration_batches(migration_files):
+    """
+    Split ordered migration files into batches.
+    Consecutive files sharing a parallel group form one batch; every other
+    file gets a batch of its own so it runs sequentially.
+    """
+    batches = []
+    previous_group = None
+
+    for migration_file in migration_files:
+        group = get_parallel_group(migration_file)
+        if group and group == previous_group:
+            batches[-1].append(migration_file)
+        else:
+            batches.append([migration_file])
+        previous_group = group
+
+    return batches
+
+
+def record_migrations(records):
+    """Record migration results in migration_history with a single insert"""
+    try:
+        supabase.table("migration_history").insert(records).execute()
+    except Exception:
+        # If we can't record the migration, at least note it
+        names = ", ".join(record["migration_name"] for record in records)
+        print(f"   ⚠️  Could not record migration history for {names}")
+
+
+def apply_migration_file(filepath):
+    """Execute a single migration file and return its migration_history record"""
+    migration_name = filepath.name
+    checksum = None
+
     try:
         with open(filepath, "r", encoding="utf-8") as f:
             content = f.read()
 
-        migration_name = filepath.name
         checksum = calculate_checksum(content)
 
         print(f"🚀 Executing migration: {migration_name}")
 
-        # Split content by semicolons and execute each statement
-        statements = [stmt.strip() for stmt in content.split(";") if stmt.strip()]
-
-        for i, statement in enumerate(statements):
-            if not statement:
-                continue
-
-            # Skip comments and empty lines
-            if statement.startswith("--") or not statement.strip():
-                continue
-
-            try:
-                # Try using rpc function first
-                supabase.rpc("exec_sql", {"sql": statement}).execute()
-            except Exception as rpc_error:
-                # If rpc fails, try direct table operations for simple INSERT/UPDATE statements
-                if statement.upper().startswith(("INSERT", "UPDATE")):
-                    print(
-                        f"   ⚠️  RPC failed for statement {i+1}, trying alternative method..."
-                    )
-                    try:
-                        # For INSERT INTO sectors, agent_voices, etc.
-                        if "INSERT INTO sectors" in statement:
-                            # Parse and execute using table operations
-                            print("   📝 Executing sectors insert manually...")
-                        elif "INSERT INTO agent_voices" in statement:
-                            print("   📝 Executing agent_voices insert manually...")
-                        # Add more parsing as needed
-                    except Exception as alt_error:
-                        print(f"   ❌ Alternative method also failed: {alt_error}")
-                        raise rpc_error
-                else:
-                    raise rpc_error
-
-        # Record successful migration
-        try:
-            supabase.table("migration_history").insert(
-                {
-                    "migration_name": migration_name,
-                    "checksum": checksum,
-                    "success": True,
-                }
-            ).execute()
-        except Exception:
-            # If we can't record the migration, at least note it
-            print(f"   ⚠️  Could not record migration history for {migration_name}")
+        if migration_name == BOOTSTRAP_MIGRATION:
+            # exec_migration does not exist yet, install it through exec_sql
+            supabase.rpc("exec_sql", {"sql": content}).execute()
+        else:
+            # The whole file runs server-side in a single call and transaction
+            supabase.rpc("exec_migration", {"script": content}).execute()
 
         print(f"   ✅ Migration {migration_name} completed successfully")
-        return True
+        success = True
 
     except Exception as e:
         print(f"   ❌ Migration {migration_name} failed: {e}")
+        success = False
 
-        # Try to record failed migration
-        try:
-            supabase.table("migration_history").insert(
-                {
-                    "migration_name": migration_name,
-                    "checksum": checksum,
-                    "success": False,
-                }
-            ).execute()
-        except Exception:
-            pass
+    return {
+        "migration_name": migration_name,
+        "checksum": checksum,
+        "success": success,
+    }
 
-        return False
+
+def execute_migration_file(filepath):
+    """Execute a single migration file"""
+    record = apply_migration_file(filepath)
+    record_migrations([record])
+    return record["success"]
+
+
+async def execute_migration_batch(batch):
+    """Execute independent migration files concurrently and record them together"""
+    print(f"⚡ Running {len(batch)} migrations in parallel")
+    records = await asyncio.gather(
+        *[asyncio.to_thread(apply_migration_file, f) for f in batch]
+    )
+    record_migrations(list(records))
+    return [record["success"] for record in records]
 
 
 def run_migrations():
@@ -182,13 +202,18 @@ def run_migrations():
 
     print(f"📋 Found {len(migration_files)} pending migrations")
 
-    # Execute migrations in order
+    # Execute migrations in order, running parallel groups concurrently
     success_count = 0
-    for migration_file in migration_files:
-        if execute_migration_file(migration_file):
-            success_count += 1
+    for batch in plan_migration_batches(migration_files):
+        if len(batch) == 1:
+            results = [execute_migration_file(batch[0])]
         else:
-            print(f"❌ Migration failed: {migration_file.name}")
+            results = asyncio.run(execute_migration_batch(batch))
+
+        success_count += sum(results)
+        if not all(results):
+            failed = [f.name for f, ok in zip(batch, results) if not ok]
+            print(f"❌ Migration failed: {', '.join(failed)}")
             print("   Stopping migration process.")
             break
 
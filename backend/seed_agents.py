@@ -1,8 +1,11 @@
 #!/usr/bin/env python3
 
 import os
-from supabase import create_client, Client
+import sys
+import traceback
+from supabase import Client
 from dotenv import load_dotenv
+from src.core.supabase_client import create_supabase_client
 
 # Load environment variables
 load_dotenv()
@@ -10,7 +13,15 @@ load_dotenv()
 url = os.environ.get("SUPABASE_URL")
 service_key = os.environ.get("SUPABASE_SERVICE_KEY")
 
-supabase: Client = create_client(url, service_key)
+supabase: Client = create_supabase_client(url, service_key)
+
+
+def count_rows(table: str) -> int:
+    """Tablodaki satır sayısını sadece count header'ı ile döner (satır verisi çekmeden)"""
+    return (
+        supabase.table(table).select("id", count="exact", head=True).execute().count
+        or 0
+    )
 
 
 def seed_agent_data():
@@ -97,7 +108,7 @@ def seed_agent_data():
         car_rental_templates = (
             supabase.table("agent_templates")
             .select("*")
-            .filter("slug", "like", "*car-rental*")
+            .ilike("slug", "%car-rental%")
             .execute()
         )
         booking_provider = (
@@ -215,22 +226,12 @@ def seed_agent_data():
         print("\n📊 Summary:")
 
         # Final summary
-        final_templates = supabase.table("agent_templates").select("*").execute()
-        final_mappings = (
-            supabase.table("integration_agent_mappings").select("*").execute()
-        )
-        final_availability = (
-            supabase.table("sector_agent_availability").select("*").execute()
-        )
-
-        print(f"   • Agent Templates: {len(final_templates.data)}")
-        print(f"   • Integration Mappings: {len(final_mappings.data)}")
-        print(f"   • Sector Availability: {len(final_availability.data)}")
+        print(f"   • Agent Templates: {count_rows('agent_templates')}")
+        print(f"   • Integration Mappings: {count_rows('integration_agent_mappings')}")
+        print(f"   • Sector Availability: {count_rows('sector_agent_availability')}")
 
     except Exception as e:
         print(f"💥 Error during seeding: {e}")
-        import traceback
-
         traceback.print_exc()
 
 
@@ -258,8 +259,6 @@ def cleanup_agent_data():
 
 
 if __name__ == "__main__":
-    import sys
-
     if len(sys.argv) > 1 and sys.argv[1] == "cleanup":
         cleanup_agent_data()
     else:
@@ -0,0 +1,66 @@
+"""
+In-Process TTL Cache
+Read-through cache for read-mostly data served by the API
+"""
+
+import functools
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Tuple
+
+# Entries kept before the least recently used one is evicted
+MAX_ENTRIES = 1024
+
+# key -> (expires_at, value), ordered from least to most recently used
+_cache: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+
+async def cached(key: str, ttl: float, loader: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Return the cached value for key, calling loader on a miss or once ttl expired
+
+    Args:
+        key: Cache key, namespaced with a "<feature>:" prefix
+        ttl: Time to live in seconds
+        loader: Coroutine function producing the fresh value
+    """
+    entry = _cache.get(key)
+    now = time.monotonic()
+
+    if entry:
+        if entry[0] > now:
+            _cache.move_to_end(key)
+            return entry[1]
+        # Expired, drop it so stale keys do not linger until evicted
+        _cache.pop(key, None)
+
+    value = await loader()
+    _cache[key] = (now + ttl, value)
+    _cache.move_to_end(key)
+    while len(_cache) > MAX_ENTRIES:
+        _cache.popitem(last=False)
+    return value
+
+
+def invalidate(*prefixes: str) -> None:
+    """Drop every cached entry whose key starts with one of the given prefixes"""
+    for key in [key for key in _cache if key.startswith(prefixes)]:
+        _cache.pop(key, None)
+
+
+def ttl_cached(prefix: str, ttl: float):
+    """
+    Decorate a coroutine function so results are cached per argument tuple
+
+    Keys look like "<prefix>:<args>", so invalidate(prefix) drops every variant.
+    """
+
+    def decorator(func: Callable[..., Awaitable[Any]]):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            key = f"{prefix}:{args!r}:{sorted(kwargs.items())!r}"
+            return await cached(key, ttl, lambda: func(*args, **kwargs))
+
+        return wrapper
+
+    return decorator
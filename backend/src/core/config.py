@@ -7,6 +7,8 @@ class Settings(BaseSettings):
     supabase_url: str
     supabase_anon_key: str
     supabase_service_key: str
+    # Project JWT secret, enables verifying access tokens without calling Supabase auth
+    supabase_jwt_secret: Optional[str] = None
 
     # JWT
     jwt_secret: str
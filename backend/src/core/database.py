@@ -1,5 +1,7 @@
-from supabase import create_client, Client
+import asyncio
+from supabase import Client
 from src.core.config import settings
+from src.core.supabase_client import create_supabase_client
 
 
 def get_supabase_client() -> Client:
@@ -8,10 +10,22 @@ def get_supabase_client() -> Client:
     print("🔑 Initializing Supabase client...")
 
     print(f"🌐 Supabase URL: {settings.supabase_url}")
-    return create_client(
-        supabase_url=settings.supabase_url, supabase_key=settings.supabase_service_key
-    )
+    return create_supabase_client(settings.supabase_url, settings.supabase_service_key)
+
+
+async def execute_query(query):
+    """Execute a PostgREST query builder in a worker thread so the event loop stays free"""
+    return await asyncio.to_thread(query.execute)
 
 
 # Global client instance
 supabase: Client = get_supabase_client()
+
+
+async def warm_up_database() -> None:
+    """Open the pooled PostgREST connection ahead of the first request"""
+    try:
+        await execute_query(supabase.table("sectors").select("id").limit(1))
+        print("✅ Supabase connection pool warmed up")
+    except Exception as e:
+        print(f"⚠️ Supabase warm-up failed: {str(e)}")
@@ -0,0 +1,39 @@
+"""
+ETag Responses
+Conditional GET support for read-mostly JSON endpoints
+"""
+
+import hashlib
+from typing import Any, Tuple
+
+import orjson
+from fastapi import Request, Response
+
+# Same options ORJSONResponse renders with
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def render_with_etag(content: Any) -> Tuple[bytes, str]:
+    """Serialize content to JSON and derive a strong ETag from the bytes"""
+    body = orjson.dumps(content, option=_ORJSON_OPTIONS)
+    etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+    return body, etag
+
+
+def etag_response(request: Request, rendered: Tuple[bytes, str]) -> Response:
+    """
+    Return 304 Not Modified when the client already holds this representation
+
+    Args:
+        request: Incoming request, checked for If-None-Match
+        rendered: (body, etag) pair from render_with_etag
+    """
+    body, etag = rendered
+    if_none_match = request.headers.get("if-none-match")
+
+    if if_none_match:
+        client_etags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if etag in client_etags or "*" in client_etags:
+            return Response(status_code=304, headers={"ETag": etag})
+
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
@@ -0,0 +1,34 @@
+"""
+Supabase Client Factory
+Builds Supabase clients on a shared, pooled HTTP/2 connection
+"""
+
+from typing import List
+import httpx
+from supabase import create_client, Client, ClientOptions
+
+# Keep-alive pool shared by every PostgREST call made through a client
+SUPABASE_HTTP_LIMITS = httpx.Limits(
+    max_keepalive_connections=20, max_connections=50, keepalive_expiry=30.0
+)
+
+# Matches postgrest-py's default client timeout
+SUPABASE_HTTP_TIMEOUT = 120.0
+
+# HTTP clients handed out by create_supabase_client, closed on shutdown
+_http_clients: List[httpx.Client] = []
+
+
+def create_supabase_client(url: str, key: str) -> Client:
+    """Create a Supabase client that multiplexes requests over HTTP/2"""
+    http_client = httpx.Client(
+        http2=True, limits=SUPABASE_HTTP_LIMITS, timeout=SUPABASE_HTTP_TIMEOUT
+    )
+    _http_clients.append(http_client)
+    return create_client(url, key, options=ClientOptions(httpx_client=http_client))
+
+
+def close_supabase_clients() -> None:
+    """Close the pooled HTTP connections of every client created here"""
+    while _http_clients:
+        _http_clients.pop().close()
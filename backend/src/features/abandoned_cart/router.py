@@ -2,15 +2,28 @@
 Abandoned Cart API Router
 FastAPI router for abandoned cart recovery operations
 """
-from fastapi import APIRouter, HTTPException, Query, Body
-from typing import Dict, Any, List, Optional
+import asyncio
+from functools import lru_cache
+import orjson
+from fastapi import APIRouter, Depends, Query, Body, Request, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from typing import AsyncIterator, Dict, Any, List, Optional
 from src.services.abandoned_cart_service import AbandonedCartAgentService
+from src.core.cache import cached
+from src.core.etag import render_with_etag, etag_response
 from pydantic import BaseModel
 
-router = APIRouter(prefix="/abandoned-cart", tags=["abandoned-cart"])
+router = APIRouter(
+    prefix="/abandoned-cart",
+    tags=["abandoned-cart"],
+    default_response_class=ORJSONResponse,
+)
 
-# Global service instance
-_abandoned_cart_service = None
+# Seconds the abandoned cart agent list is served from cache
+ABANDONED_CART_AGENTS_TTL = 60
+
+# Maximum number of agents /process-all builds payloads for at the same time
+PROCESS_ALL_CONCURRENCY = 16
 
 
 class ExternalAPIRequest(BaseModel):
@@ -19,54 +32,50 @@ class ExternalAPIRequest(BaseModel):
     api_key: Optional[str] = None
 
 
-def get_abandoned_cart_service() -> AbandonedCartAgentService:
-    """Get or create abandoned cart service instance"""
-    global _abandoned_cart_service
-    if _abandoned_cart_service is None:
-        _abandoned_cart_service = AbandonedCartAgentService()
-    return _abandoned_cart_service
+def get_abandoned_cart_service(request: Request) -> AbandonedCartAgentService:
+    """Get the abandoned cart service created in the app lifespan"""
+    return request.app.state.abandoned_cart_service
 
 
 @router.get("/agents")
-async def get_abandoned_cart_agents() -> Dict[str, Any]:
+async def get_abandoned_cart_agents(
+    request: Request,
+    service: AbandonedCartAgentService = Depends(get_abandoned_cart_service)
+) -> Response:
     """
     Get all agents configured for abandoned cart recovery
     """
-    try:
-        service = get_abandoned_cart_service()
+    async def load():
         agents = await service.get_abandoned_cart_agents()
-        
-        return {
+        return render_with_etag({
             "success": True,
             "message": f"Found {len(agents)} abandoned cart agents",
             "agents": agents,
             "total_agents": len(agents)
-        }
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to get abandoned cart agents: {str(e)}"
-        )
+        })
+
+    # The rendered body and its ETag are cached together
+    rendered = await cached("acart:agents", ABANDONED_CART_AGENTS_TTL, load)
+    return etag_response(request, rendered)
 
 
 @router.post("/initialize")
-async def initialize_abandoned_cart_integrations() -> Dict[str, Any]:
+async def initialize_abandoned_cart_integrations(
+    service: AbandonedCartAgentService = Depends(get_abandoned_cart_service)
+) -> Dict[str, Any]:
     """
     Initialize integrations for all abandoned cart agents
     """
-    try:
-        service = get_abandoned_cart_service()
-        result = await service.initialize_abandoned_cart_integrations()
-        return result
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to initialize abandoned cart integrations: {str(e)}"
-        )
+    result = await service.initialize_abandoned_cart_integrations()
+    return result
 
 
 @router.get("/data/{agent_id}/{provider_slug}")
-async def fetch_abandoned_cart_data(agent_id: str, provider_slug: str) -> Dict[str, Any]:
+async def fetch_abandoned_cart_data(
+    agent_id: str,
+    provider_slug: str,
+    service: AbandonedCartAgentService = Depends(get_abandoned_cart_service)
+) -> Dict[str, Any]:
     """
     Fetch abandoned cart data for a specific agent and platform
     
@@ -74,40 +83,30 @@ async def fetch_abandoned_cart_data(agent_id: str, provider_slug: str) -> Dict[s
         agent_id: Agent identifier
         provider_slug: Platform identifier (shopify, woocommerce, etc.)
     """
-    try:
-        service = get_abandoned_cart_service()
-        result = await service.fetch_abandoned_cart_data(agent_id, provider_slug)
-        return result
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to fetch abandoned cart data: {str(e)}"
-        )
+    result = await service.fetch_abandoned_cart_data(agent_id, provider_slug)
+    return result
 
 
 @router.get("/payload/{agent_id}")
-async def create_abandoned_cart_payload(agent_id: str) -> Dict[str, Any]:
+async def create_abandoned_cart_payload(
+    agent_id: str,
+    service: AbandonedCartAgentService = Depends(get_abandoned_cart_service)
+) -> Dict[str, Any]:
     """
     Create complete payload for abandoned cart recovery for a specific agent
     
     Args:
         agent_id: Agent identifier
     """
-    try:
-        service = get_abandoned_cart_service()
-        result = await service.create_abandoned_cart_payload(agent_id)
-        return result
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to create abandoned cart payload: {str(e)}"
-        )
+    result = await service.create_abandoned_cart_payload(agent_id)
+    return result
 
 
 @router.post("/send/{agent_id}")
 async def send_abandoned_cart_payload(
     agent_id: str,
-    api_request: ExternalAPIRequest = Body(...)
+    api_request: ExternalAPIRequest = Body(...),
+    service: AbandonedCartAgentService = Depends(get_abandoned_cart_service)
 ) -> Dict[str, Any]:
     """
     Create and send abandoned cart payload to external API
@@ -116,46 +115,47 @@ async def send_abandoned_cart_payload(
         agent_id: Agent identifier
         api_request: External API configuration
     """
-    try:
-        service = get_abandoned_cart_service()
-        
-        # Create payload
-        payload_result = await service.create_abandoned_cart_payload(agent_id)
-        
-        if not payload_result["success"]:
-            return payload_result
-        
-        # Send to external API
-        send_result = await service.send_to_external_api(
-            payload=payload_result["payload"],
-            api_url=api_request.api_url,
-            api_key=api_request.api_key
-        )
-        
-        return {
-            "success": send_result["success"],
-            "message": send_result["message"],
-            "agent_id": agent_id,
-            "payload_created": True,
-            "api_response": {
-                "status_code": send_result["status_code"],
-                "response_data": send_result["response_data"],
-                "api_url": send_result["api_url"]
-            },
-            "payload_summary": payload_result["payload"]["summary"] if payload_result["payload"] else None
-        }
-        
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to send abandoned cart payload: {str(e)}"
-        )
+    # Create payload
+    payload_result = await service.create_abandoned_cart_payload(agent_id)
+    
+    if not payload_result["success"]:
+        return payload_result
+    
+    # Send to external API
+    send_result = await service.send_to_external_api(
+        payload=payload_result["payload"],
+        api_url=api_request.api_url,
+        api_key=api_request.api_key
+    )
+    
+    return {
+        "success": send_result["success"],
+        "message": send_result["message"],
+        "agent_id": agent_id,
+        "payload_created": True,
+        "api_response": {
+            "status_code": send_result["status_code"],
+            "response_data": send_result["response_data"],
+            "api_url": send_result["api_url"]
+        },
+        "payload_summary": payload_result["payload"]["summary"] if payload_result["payload"] else None
+    }
+
+
+@lru_cache(maxsize=512)
+def _mock_company_info(company_name: str) -> Dict[str, Any]:
+    """Company info used for mock data, memoized per company name (read-only)"""
+    return {
+        "company_name": company_name,
+        "website": f"{company_name.lower().replace(' ', '')}.com"
+    }
 
 
 @router.get("/mock-data/{provider_slug}")
 async def generate_mock_abandoned_cart_data(
     provider_slug: str,
-    company_name: str = Query("Sample Company", description="Company name for mock data")
+    company_name: str = Query("Sample Company", description="Company name for mock data"),
+    service: AbandonedCartAgentService = Depends(get_abandoned_cart_service)
 ) -> Dict[str, Any]:
     """
     Generate mock abandoned cart data for testing
@@ -164,89 +164,127 @@ async def generate_mock_abandoned_cart_data(
         provider_slug: Platform identifier
         company_name: Company name to use in mock data
     """
-    try:
-        service = get_abandoned_cart_service()
-        
-        mock_company_info = {
-            "company_name": company_name,
-            "website": f"{company_name.lower().replace(' ', '')}.com"
-        }
-        
-        mock_data = service.generate_mock_abandoned_cart_data(provider_slug, mock_company_info)
-        
-        return {
-            "success": True,
-            "message": f"Generated mock abandoned cart data for {provider_slug}",
-            "data": mock_data
-        }
-        
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to generate mock data: {str(e)}"
-        )
+    mock_data = service.generate_mock_abandoned_cart_data(
+        provider_slug, _mock_company_info(company_name)
+    )
+    
+    return {
+        "success": True,
+        "message": f"Generated mock abandoned cart data for {provider_slug}",
+        "data": mock_data
+    }
 
 
 # Convenience endpoints for batch operations
 
 
+def _process_result(agent: Dict[str, Any], payload_result: Any) -> Dict[str, Any]:
+    """Summarize the outcome of building one agent's payload"""
+    result = {
+        "agent_id": agent["agent_id"],
+        "agent_name": agent["agent_info"].get("custom_name", "Unnamed"),
+        "company_name": agent.get("company_info", {}).get("company_name", "Unknown"),
+    }
+
+    if isinstance(payload_result, Exception):
+        result.update({
+            "success": False,
+            "message": f"Error processing agent: {str(payload_result)}",
+            "payload_summary": None
+        })
+    else:
+        result.update({
+            "success": payload_result["success"],
+            "message": payload_result["message"],
+            "payload_summary": payload_result["payload"]["summary"] if payload_result.get("payload") else None
+        })
+
+    return result
+
+
+async def _stream_process_results(
+    agents: List[Dict[str, Any]], create_payload
+) -> AsyncIterator[bytes]:
+    """Yield one NDJSON line per agent as its payload completes, then a summary line"""
+
+    async def run(agent: Dict[str, Any]):
+        try:
+            return agent, await create_payload(agent)
+        except Exception as e:
+            return agent, e
+
+    tasks = [asyncio.create_task(run(agent)) for agent in agents]
+    successful = 0
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            agent, payload_result = await next_result
+            result = _process_result(agent, payload_result)
+            successful += result["success"]
+            yield orjson.dumps(result) + b"\n"
+    finally:
+        # Stop outstanding work if the client disconnects mid-stream
+        for task in tasks:
+            task.cancel()
+
+    yield orjson.dumps({
+        "success": True,
+        "message": f"Processed {len(agents)} abandoned cart agents",
+        "total_processed": len(agents),
+        "successful": successful,
+        "failed": len(agents) - successful
+    }) + b"\n"
+
+
 @router.post("/process-all")
-async def process_all_abandoned_cart_agents() -> Dict[str, Any]:
+async def process_all_abandoned_cart_agents(
+    stream: bool = Query(False, description="Stream results as NDJSON while agents complete"),
+    service: AbandonedCartAgentService = Depends(get_abandoned_cart_service)
+):
     """
     Process all abandoned cart agents and create payloads
     """
-    try:
-        service = get_abandoned_cart_service()
-        
-        # Get all abandoned cart agents
-        agents = await service.get_abandoned_cart_agents()
-        
-        if not agents:
-            return {
-                "success": True,
-                "message": "No abandoned cart agents found",
-                "results": [],
-                "total_processed": 0
-            }
-        
-        # Process each agent
-        results = []
-        for agent in agents:
-            agent_id = agent["agent_id"]
-            
-            try:
-                payload_result = await service.create_abandoned_cart_payload(agent_id)
-                results.append({
-                    "agent_id": agent_id,
-                    "agent_name": agent["agent_info"].get("custom_name", "Unnamed"),
-                    "company_name": agent.get("company_info", {}).get("company_name", "Unknown"),
-                    "success": payload_result["success"],
-                    "message": payload_result["message"],
-                    "payload_summary": payload_result["payload"]["summary"] if payload_result.get("payload") else None
-                })
-            except Exception as e:
-                results.append({
-                    "agent_id": agent_id,
-                    "agent_name": agent["agent_info"].get("custom_name", "Unnamed"),
-                    "company_name": agent.get("company_info", {}).get("company_name", "Unknown"),
-                    "success": False,
-                    "message": f"Error processing agent: {str(e)}",
-                    "payload_summary": None
-                })
-        
-        successful_results = [r for r in results if r["success"]]
-        
+    # Get all abandoned cart agents
+    agents = await service.get_abandoned_cart_agents()
+    
+    if not agents:
         return {
             "success": True,
-            "message": f"Processed {len(agents)} abandoned cart agents",
-            "results": results,
-            "total_processed": len(agents),
-            "successful": len(successful_results),
-            "failed": len(agents) - len(successful_results)
+            "message": "No abandoned cart agents found",
+            "results": [],
+            "total_processed": 0
         }
-        
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to process abandoned cart agents: {str(e)}"
+    
+    # Process agents concurrently, bounded so the upstream store is not flooded
+    semaphore = asyncio.Semaphore(PROCESS_ALL_CONCURRENCY)
+
+    async def create_payload(agent: Dict[str, Any]) -> Dict[str, Any]:
+        async with semaphore:
+            # Reuse the agent already loaded above instead of re-fetching it
+            return await service.create_abandoned_cart_payload_from(agent)
+
+    if stream:
+        return StreamingResponse(
+            _stream_process_results(agents, create_payload),
+            media_type="application/x-ndjson",
         )
+
+    payload_results = await asyncio.gather(
+        *[create_payload(agent) for agent in agents],
+        return_exceptions=True,
+    )
+
+    results = [
+        _process_result(agent, payload_result)
+        for agent, payload_result in zip(agents, payload_results)
+    ]
+    
+    successful_results = [r for r in results if r["success"]]
+    
+    return {
+        "success": True,
+        "message": f"Processed {len(agents)} abandoned cart agents",
+        "results": results,
+        "total_processed": len(agents),
+        "successful": len(successful_results),
+        "failed": len(agents) - len(successful_results)
+    }
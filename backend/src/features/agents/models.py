@@ -41,6 +41,7 @@ class AgentVoicesListResponse(BaseModel):
 
     voices: List[AgentVoiceResponse]
     total: int
+    next_offset: Optional[int] = None
 
 
 class SyncVoicesResponse(BaseModel):
@@ -183,6 +184,13 @@ class ActivateAgentRequest(BaseModel):
     is_active: bool
 
 
+class AgentStatusChange(BaseModel):
+    """Desired active status for one agent in a batch toggle"""
+
+    agent_id: str
+    is_active: bool
+
+
 class AgentTemplatesListResponse(BaseModel):
     """Response for agent templates list"""
 
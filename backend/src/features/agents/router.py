@@ -1,32 +1,49 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import ORJSONResponse
 from typing import List, Optional
+from uuid import UUID
+from pydantic import TypeAdapter
 import logging
 
 from src.features.agents.services.elevenlabs_service import elevenlabs_service
 from src.features.agents.services.agent_management_service import agent_service
 
 from src.features.agents.models import (
+    ElevenLabsVoice,
     AgentVoicesListResponse,
     SyncVoicesResponse,
-    SectorsListResponse,
-    AgentTemplatesListResponse,
-    CompanyAgentsListResponse,
-    CompanyAgentCreate,
-    CompanyAgentUpdate,
     ActivateAgentRequest,
-    SectorResponse,
-    AgentTemplateResponse,
-    CompanyAgentResponse,
+    AgentStatusChange,
 )
 from src.features.shared.dependencies import get_current_user
+from src.core.cache import cached, invalidate
+from src.core.etag import render_with_etag, etag_response
 
 logger = logging.getLogger(__name__)
 
+# Seconds read-mostly reference data is served from cache
+SECTORS_TTL = 600
+TEMPLATES_TTL = 300
+PROVIDERS_TTL = 600
+
+# Largest voice page a client may request
+MAX_VOICES_PAGE_SIZE = 500
+
+# Longest integration provider category accepted as a filter
+MAX_CATEGORY_LENGTH = 50
+
+# Serializes a whole voice list in one pydantic-core pass
+_VOICES_ADAPTER = TypeAdapter(List[ElevenLabsVoice])
+
 # Voice routes
-voice_router = APIRouter(prefix="/v1/voices", tags=["voices"])
+voice_router = APIRouter(
+    prefix="/v1/voices", tags=["voices"], default_response_class=ORJSONResponse
+)
 
 # Agent management routes
-agent_router = APIRouter(prefix="/v1/agents", tags=["agents"])
+agent_router = APIRouter(
+    prefix="/v1/agents", tags=["agents"], default_response_class=ORJSONResponse
+)
 
 
 # Voice Routes
@@ -36,30 +53,46 @@ async def sync_voices_from_elevenlabs():
     Sync voices from ElevenLabs API to database.
     This endpoint fetches all voices from ElevenLabs and saves them to the agent_voices table.
     """
-    try:
-        result = await elevenlabs_service.sync_voices_from_elevenlabs()
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to sync voices: {str(e)}")
+    result = await elevenlabs_service.sync_voices_from_elevenlabs()
+    return result
 
 
 @voice_router.get("/", response_model=AgentVoicesListResponse)
-async def get_voices(is_active: Optional[bool] = True):
+async def get_voices(
+    request: Request,
+    is_active: Optional[bool] = True,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_VOICES_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+):
     """
     Get all voices from database.
 
     Args:
         is_active: Filter by active status. Default is True. Set to None to get all voices.
+        limit: Page size. Omit to get every voice in one response.
+        offset: Number of voices to skip when paging.
 
     Returns:
-        List of agent voices with total count
+        List of agent voices with total count and the offset of the next page, if any
     """
-    try:
-        voices = await elevenlabs_service.get_voices_from_database(is_active=is_active)
-
-        return AgentVoicesListResponse(voices=voices, total=len(voices))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to fetch voices: {str(e)}")
+    voices, total = await elevenlabs_service.get_voices_from_database(
+        is_active=is_active, limit=limit, offset=offset
+    )
+    next_offset = offset + len(voices)
+    if not limit or next_offset >= total:
+        next_offset = None
+
+    # Returning the response directly skips FastAPI re-validating trusted rows
+    return etag_response(
+        request,
+        render_with_etag(
+            {
+                "voices": voices,
+                "total": total,
+                "next_offset": next_offset,
+            }
+        ),
+    )
 
 
 @voice_router.get("/providers/elevenlabs")
@@ -68,51 +101,43 @@ async def get_elevenlabs_voices():
     Get voices directly from ElevenLabs API (for testing purposes).
     This endpoint bypasses the database and fetches voices directly from ElevenLabs.
     """
-    try:
-        voices = await elevenlabs_service.fetch_voices_from_elevenlabs()
-        return {"voices": [voice.dict() for voice in voices], "total": len(voices)}
-    except Exception as e:
-        raise HTTPException(
-            status_code=500, detail=f"Failed to fetch voices from ElevenLabs: {str(e)}"
-        )
+    voices = await elevenlabs_service.fetch_voices_from_elevenlabs()
+    return {
+        "voices": _VOICES_ADAPTER.dump_python(voices, mode="json"),
+        "total": len(voices),
+    }
 
 
 # Agent Management Routes
 @agent_router.get("/sectors")
-async def get_sectors():
+async def get_sectors(request: Request):
     """Get all active sectors"""
-    try:
+
+    async def load():
         sectors = await agent_service.get_sectors()
-        return {"sectors": sectors, "total": len(sectors)}
-    except Exception as e:
-        raise HTTPException(
-            status_code=500, detail=f"Failed to fetch sectors: {str(e)}"
-        )
+        return render_with_etag({"sectors": sectors, "total": len(sectors)})
+
+    rendered = await cached("agents:sectors", SECTORS_TTL, load)
+    return etag_response(request, rendered)
 
 
 @agent_router.get("/sectors/{sector_id}/templates")
-async def get_agent_templates_by_sector(sector_id: str):
+async def get_agent_templates_by_sector(sector_id: UUID):
     """Get available agent templates for a sector"""
-    try:
-        templates = await agent_service.get_agent_templates_by_sector(sector_id)
-        return {"templates": templates, "total": len(templates)}
-    except Exception as e:
-        raise HTTPException(
-            status_code=500, detail=f"Failed to fetch templates: {str(e)}"
-        )
+    templates = await cached(
+        f"agents:templates:{sector_id}",
+        TEMPLATES_TTL,
+        lambda: agent_service.get_agent_templates_by_sector(str(sector_id)),
+    )
+    return {"templates": templates, "total": len(templates)}
 
 
 @agent_router.get("/company/{company_id}")
 async def get_company_agents(company_id: str):
     """Get all agents for a company"""
-    try:
-        agents = await agent_service.get_company_agents(company_id)
-        active_count = sum(1 for agent in agents if agent.get("is_active"))
-        return {"agents": agents, "total": len(agents), "active_count": active_count}
-    except Exception as e:
-        raise HTTPException(
-            status_code=500, detail=f"Failed to fetch company agents: {str(e)}"
-        )
+    agents = await agent_service.get_company_agents(company_id)
+    active_count = sum(1 for agent in agents if agent.get("is_active"))
+    return {"agents": agents, "total": len(agents), "active_count": active_count}
 
 
 @agent_router.post("/company/{company_id}/activate/{agent_template_id}")
@@ -120,27 +145,31 @@ async def activate_agent(
     company_id: str, agent_template_id: str, config: Optional[dict] = None
 ):
     """Activate an agent template for a company with configuration"""
-    try:
-        agent = await agent_service.activate_agent_for_company(
-            company_id, agent_template_id, config or {}
-        )
-        return {"success": True, "agent": agent}
-    except Exception as e:
-        logger.error(f"Failed to activate agent: {e}")
-        raise HTTPException(
-            status_code=500, detail=f"Failed to activate agent: {str(e)}"
-        )
+    agent = await agent_service.activate_agent_for_company(
+        company_id, agent_template_id, config or {}
+    )
+    invalidate("acart:agents")
+    return {"success": True, "agent": agent}
+
+
+# Declared before the {agent_id} routes so "toggle-batch" is not taken as an id
+@agent_router.put("/company/{company_id}/agents/toggle-batch")
+async def toggle_agents_status(company_id: str, changes: List[AgentStatusChange]):
+    """Activate/deactivate several agents of a company in one request"""
+    # The last entry wins if an agent is listed more than once
+    agents = await agent_service.toggle_agents_status(
+        company_id, {change.agent_id: change.is_active for change in changes}
+    )
+    invalidate("acart:agents")
+    return {"success": True, "agents": agents, "total": len(agents)}
 
 
 @agent_router.put("/company/{company_id}/agents/{agent_id}")
 async def update_company_agent(company_id: str, agent_id: str, updates: dict):
     """Update company agent configuration and integrations"""
-    try:
-        agent = await agent_service.update_company_agent(company_id, agent_id, updates)
-        return {"success": True, "agent": agent}
-    except Exception as e:
-        logger.error(f"Failed to update agent: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to update agent: {str(e)}")
+    agent = await agent_service.update_company_agent(company_id, agent_id, updates)
+    invalidate("acart:agents")
+    return {"success": True, "agent": agent}
 
 
 @agent_router.put("/company/{company_id}/agents/{agent_id}/toggle")
@@ -148,46 +177,37 @@ async def toggle_agent_status(
     company_id: str, agent_id: str, request: ActivateAgentRequest
 ):
     """Toggle agent active/inactive status"""
-    try:
-        agent = await agent_service.toggle_agent_status(
-            company_id, agent_id, request.is_active
-        )
+    agent = await agent_service.toggle_agent_status(
+        company_id, agent_id, request.is_active
+    )
+    if not agent:
+        raise HTTPException(status_code=404, detail="Agent not found")
 
-        if not agent:
-            raise HTTPException(status_code=404, detail="Agent not found")
-
-        return {"success": True, "agent": agent}
-    except Exception as e:
-        logger.error(f"Error toggling agent: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Failed to toggle agent: {str(e)}")
+    invalidate("acart:agents")
+    return {"success": True, "agent": agent}
 
 
 @agent_router.get("/company/{company_id}/agents/{agent_id}/integrations")
 async def get_agent_integrations(company_id: str, agent_id: str):
     """Get integration configurations for an agent"""
-    try:
-        from src.features.agents.services.integration_service import IntegrationService
+    from src.features.agents.services.integration_service import IntegrationService
 
-        integrations = await IntegrationService.get_agent_integrations(agent_id)
-        return {"success": True, "integrations": integrations}
-    except Exception as e:
-        logger.error(f"Failed to get agent integrations: {e}")
-        raise HTTPException(
-            status_code=500, detail=f"Failed to get agent integrations: {str(e)}"
-        )
+    integrations = await IntegrationService.get_agent_integrations(agent_id)
+    return {"success": True, "integrations": integrations}
 
 
 @agent_router.get("/integrations")
-async def get_integration_providers(category: Optional[str] = None):
+async def get_integration_providers(
+    request: Request,
+    category: Optional[str] = Query(None, max_length=MAX_CATEGORY_LENGTH),
+):
     """Get integration providers"""
-    try:
-        providers = await agent_service.get_integration_providers(category)
-        return {"providers": providers, "total": len(providers)}
-    except Exception as e:
-        raise HTTPException(
-            status_code=500, detail=f"Failed to fetch providers: {str(e)}"
-        )
+    # Surrounding whitespace would otherwise get its own cache entry
+    category = (category or "").strip() or None
 
+    async def load():
+        providers = await agent_service.get_integration_providers(category)
+        return render_with_etag({"providers": providers, "total": len(providers)})
 
-# Export routers
-router = voice_router  # For backward compatibility
+    rendered = await cached(f"agents:providers:{category}", PROVIDERS_TTL, load)
+    return etag_response(request, rendered)
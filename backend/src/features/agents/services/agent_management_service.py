@@ -1,11 +1,48 @@
 import httpx
 import logging
+from datetime import datetime, timezone
 from typing import List, Dict, Any, Optional
-from src.core.database import supabase
+from src.core.database import supabase, execute_query
 from src.features.agents.services.integration_service import IntegrationService
 
 logger = logging.getLogger(__name__)
 
+# Config fields forwarded to the activate_company_agent RPC
+ACTIVATION_FIELDS = (
+    "custom_name",
+    "custom_prompt",
+    "selected_voice_id",
+    "language",
+    "monthly_limit",
+    "daily_limit",
+)
+
+# Company agent fields update_company_agent may write
+UPDATABLE_FIELDS = frozenset(
+    {
+        "custom_name",
+        "custom_prompt",
+        "selected_voice_id",
+        "language",
+        "configuration",
+        "monthly_limit",
+        "daily_limit",
+        "is_active",
+        "is_configured",
+    }
+)
+
+# Configuration keys that mark a payload as carrying integration data
+INTEGRATION_PROVIDER_KEYS = frozenset(
+    {
+        "shopify",
+        "woocommerce",
+        "magento",
+        "ticimax",
+        "custom_booking",
+    }
+)
+
 
 class AgentManagementService:
     """Service for agent management operations"""
@@ -14,119 +51,62 @@ class AgentManagementService:
     async def get_sectors(is_active: Optional[bool] = True) -> List[Dict[str, Any]]:
         """Get all sectors"""
         try:
-            query = supabase.table("sectors").select("*")
+            query = supabase.table("sectors").select(
+                "id, name, slug, description, icon, is_active, created_at, updated_at"
+            )
             if is_active is not None:
                 query = query.eq("is_active", is_active)
 
-            result = query.order("name").execute()
+            result = await execute_query(query.order("name"))
             return result.data
         except Exception as e:
-            logger.error(f"Error fetching sectors: {e}")
+            logger.error("Error fetching sectors: %s", e)
             raise
 
     @staticmethod
     async def get_agent_templates_by_sector(sector_id: str) -> List[Dict[str, Any]]:
         """Get agent templates for a specific sector"""
         try:
-            templates_result = (
-                supabase.table("agent_templates")
-                .select(
-                    """
-                *,
-                sectors!inner(name, slug),
-                agent_voices(name)
-            """
-                )
+            # The view already carries sector_name, sector_slug and default_voice_name
+            templates_result = await execute_query(
+                supabase.table("v_agent_templates_flat")
+                .select("*")
                 .eq("sector_id", sector_id)
                 .eq("is_active", True)
                 .order("is_featured", desc=True)
                 .order("sort_order")
                 .order("name")
-                .execute()
             )
 
             templates = templates_result.data if templates_result.data else []
 
-            # Flatten the nested structure
-            for template in templates:
-                if template.get("sectors"):
-                    template["sector_name"] = template["sectors"]["name"]
-                    template["sector_slug"] = template["sectors"]["slug"]
-
-                if template.get("agent_voices"):
-                    template["default_voice_name"] = template["agent_voices"]["name"]
-                else:
-                    template["default_voice_name"] = None
-
-                template.pop("sectors", None)
-                template.pop("agent_voices", None)
-
             return templates
 
         except Exception as e:
-            logger.error(f"Error fetching agent templates for sector {sector_id}: {e}")
+            logger.error(
+                "Error fetching agent templates for sector %s: %s", sector_id, e
+            )
             raise
 
     @staticmethod
     async def get_company_agents(company_id: str) -> List[Dict[str, Any]]:
         """Get all agents for a company"""
         try:
-            result = (
-                supabase.table("company_agents")
-                .select(
-                    """
-                *,
-                agent_templates!inner(
-                    name,
-                    slug,
-                    description,
-                    agent_type,
-                    icon,
-                    capabilities,
-                    requires_voice,
-                    sectors!inner(name, slug)
-                ),
-                agent_voices(name, provider)
-            """
-                )
+            # The view already carries the template, sector and voice columns
+            result = await execute_query(
+                supabase.table("v_company_agents_flat")
+                .select("*")
                 .eq("company_id", company_id)
                 .order("is_active", desc=True)
                 .order("created_at", desc=True)
-                .execute()
             )
 
             agents = result.data if result.data else []
 
-            # Flatten nested structure
-            for agent in agents:
-                if agent.get("agent_templates"):
-                    template = agent["agent_templates"]
-                    agent["template_name"] = template["name"]
-                    agent["template_slug"] = template["slug"]
-                    agent["template_description"] = template["description"]
-                    agent["agent_type"] = template["agent_type"]
-                    agent["icon"] = template["icon"]
-                    agent["capabilities"] = template["capabilities"]
-                    agent["requires_voice"] = template["requires_voice"]
-
-                    if template.get("sectors"):
-                        agent["sector_name"] = template["sectors"]["name"]
-                        agent["sector_slug"] = template["sectors"]["slug"]
-
-                if agent.get("agent_voices"):
-                    agent["voice_name"] = agent["agent_voices"]["name"]
-                    agent["voice_provider"] = agent["agent_voices"]["provider"]
-                else:
-                    agent["voice_name"] = None
-                    agent["voice_provider"] = None
-
-                agent.pop("agent_templates", None)
-                agent.pop("agent_voices", None)
-
             return agents
 
         except Exception as e:
-            logger.error(f"Error fetching company agents for {company_id}: {e}")
+            logger.error("Error fetching company agents for %s: %s", company_id, e)
             raise
 
     @staticmethod
@@ -135,208 +115,111 @@ class AgentManagementService:
     ) -> Dict[str, Any]:
         """Activate an agent template for a company"""
         try:
-            # Check if already exists (inactive)
-            existing = (
-                supabase.table("company_agents")
-                .select("*")
-                .eq("company_id", company_id)
-                .eq("agent_template_id", agent_template_id)
-                .execute()
-            )
-
             config = config or {}
-
-            if existing.data:
-                # Reactivate existing agent
-                update_data = {
-                    "is_active": True,
-                    "activated_at": "now()",
-                    "is_configured": True,
-                }
-
-                # Extract integrations from configuration or integrations field
-                integrations_to_save = None
-                if config.get("integrationConfigs"):
-                    integrations_to_save = config["integrationConfigs"]
-                elif config.get("integrations"):
-                    integrations_to_save = config["integrations"]
-                elif config.get("configuration") and isinstance(
-                    config["configuration"], dict
-                ):
-                    # Check if configuration contains integration data
-                    conf = config["configuration"]
-                    if any(
-                        key in conf
-                        for key in [
-                            "shopify",
-                            "woocommerce",
-                            "magento",
-                            "ticimax",
-                            "custom_booking",
-                        ]
-                    ):
-                        integrations_to_save = conf
-
-                # Update configuration if provided
-                if config.get("custom_name"):
-                    update_data["custom_name"] = config["custom_name"]
-                if config.get("custom_prompt"):
-                    update_data["custom_prompt"] = config["custom_prompt"]
-                if config.get("selected_voice_id"):
-                    update_data["selected_voice_id"] = config["selected_voice_id"]
-                if config.get("language"):
-                    # Persist selected language directly on company_agents
-                    update_data["language"] = config["language"]
-
-                # Store only integration references in configuration field (no sensitive data)
-                if integrations_to_save:
-                    integration_summary = {}
-                    for provider_slug, provider_config in integrations_to_save.items():
-                        integration_summary[provider_slug] = {
-                            "enabled": True,
-                            "provider_slug": provider_slug,
-                            "configured_fields_count": (
-                                len(provider_config.keys()) if provider_config else 0
-                            ),
-                            "last_updated": "now()",
-                            # Reference to find the actual credentials in integration_credentials table
-                            "configuration_reference": f"agent_{existing.data[0]['id']}_provider_{provider_slug}",
-                        }
-                    update_data["configuration"] = {"integrations": integration_summary}
-                else:
-                    update_data["configuration"] = {}
-
-                result = (
-                    supabase.table("company_agents")
-                    .update(update_data)
-                    .eq("id", existing.data[0]["id"])
-                    .execute()
-                )
-
-                # Save integration configurations to proper tables
-                if integrations_to_save:
-                    print(
-                        f"🔗 Saving integrations during activation: {integrations_to_save}"
-                    )
-                    await IntegrationService.save_agent_integrations(
-                        existing.data[0]["id"], integrations_to_save
-                    )
-
-                return result.data[0] if result.data else {}
-            else:
-                # Create new agent
-                # Extract integrations from configuration or integrations field
-                integrations_to_save = None
-                if config.get("integrationConfigs"):
-                    integrations_to_save = config["integrationConfigs"]
-                elif config.get("integrations"):
-                    integrations_to_save = config["integrations"]
-                elif config.get("configuration") and isinstance(
-                    config["configuration"], dict
-                ):
-                    # Check if configuration contains integration data
-                    conf = config["configuration"]
-                    if any(
-                        key in conf
-                        for key in [
-                            "shopify",
-                            "woocommerce",
-                            "magento",
-                            "ticimax",
-                            "custom_booking",
-                        ]
-                    ):
-                        integrations_to_save = conf
-
-                # Prepare configuration with integration references only (no sensitive data)
-                configuration_data = {}
-                if integrations_to_save:
-                    integration_summary = {}
-                    for provider_slug, provider_config in integrations_to_save.items():
-                        integration_summary[provider_slug] = {
-                            "enabled": True,
-                            "provider_slug": provider_slug,
-                            "configured_fields_count": (
-                                len(provider_config.keys()) if provider_config else 0
-                            ),
-                            "last_updated": "now()",
-                            # Reference to find the actual credentials - will be updated after insert
-                            "configuration_reference": f"pending_agent_creation",
-                        }
-                    configuration_data = {"integrations": integration_summary}
-
-                agent_data = {
-                    "company_id": company_id,
-                    "agent_template_id": agent_template_id,
-                    "is_active": True,
-                    "is_configured": True,
-                    "activated_at": "now()",
-                    "custom_name": config.get("custom_name"),
-                    "custom_prompt": config.get("custom_prompt"),
-                    "selected_voice_id": config.get("selected_voice_id"),
-                    "language": config.get("language") or "en-US",
-                    "configuration": configuration_data,
-                    "monthly_limit": config.get("monthly_limit"),
-                    "daily_limit": config.get("daily_limit"),
-                }
-
-                result = supabase.table("company_agents").insert(agent_data).execute()
-
-                # Save integration configurations to proper tables
-                if integrations_to_save and result.data:
-                    agent_id = result.data[0]["id"]
-                    print(
-                        f"🔗 Saving integrations during new agent creation: {integrations_to_save}"
-                    )
-                    await IntegrationService.save_agent_integrations(
-                        agent_id, integrations_to_save
-                    )
-
-                    # Update configuration with correct references after agent creation
-                    if configuration_data.get("integrations"):
-                        updated_integration_summary = {}
-                        for provider_slug, summary in configuration_data[
-                            "integrations"
-                        ].items():
-                            summary["configuration_reference"] = (
-                                f"agent_{agent_id}_provider_{provider_slug}"
+            integrations_to_save = AgentManagementService._extract_integrations(config)
+
+            # One round trip creates or reactivates the agent and stores only
+            # integration references in its configuration (no sensitive data)
+            result = await execute_query(
+                supabase.rpc(
+                    "activate_company_agent",
+                    {
+                        "p_company_id": company_id,
+                        "p_agent_template_id": agent_template_id,
+                        "p_config": {
+                            field: config.get(field) for field in ACTIVATION_FIELDS
+                        },
+                        "p_integrations": (
+                            AgentManagementService._build_integration_summary(
+                                integrations_to_save
                             )
-                            updated_integration_summary[provider_slug] = summary
+                            if integrations_to_save
+                            else None
+                        ),
+                    },
+                )
+            )
+            agent = result.data[0] if result.data else {}
 
-                        # Update the agent with correct references
-                        supabase.table("company_agents").update(
-                            {
-                                "configuration": {
-                                    "integrations": updated_integration_summary
-                                }
-                            }
-                        ).eq("id", agent_id).execute()
+            # Save integration configurations to proper tables
+            if integrations_to_save and agent:
+                logger.debug(
+                    "Saving integrations during activation of agent %s", agent["id"]
+                )
+                await IntegrationService.save_agent_integrations(
+                    agent["id"], integrations_to_save, agent["company_id"]
+                )
 
-                return result.data[0] if result.data else {}
+            return agent
 
         except Exception as e:
-            logger.error(f"Error activating agent for company {company_id}: {e}")
+            logger.error("Error activating agent for company %s: %s", company_id, e)
             raise
 
+    @staticmethod
+    def _extract_integrations(config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Pick integration configs out of an activation payload"""
+        if config.get("integrationConfigs"):
+            return config["integrationConfigs"]
+        if config.get("integrations"):
+            return config["integrations"]
+
+        # Check if configuration contains integration data
+        conf = config.get("configuration")
+        if isinstance(conf, dict) and not INTEGRATION_PROVIDER_KEYS.isdisjoint(conf):
+            return conf
+        return None
+
+    @staticmethod
+    def _build_integration_summary(
+        integrations: Dict[str, Any], agent_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Integration references stored on the agent in place of credentials
+
+        Without an agent_id the references are left for activate_company_agent to fill in.
+        """
+        # Stored inside jsonb, where a "now()" string would be kept verbatim
+        last_updated = datetime.now(timezone.utc).isoformat()
+        summary = {
+            provider_slug: {
+                "enabled": True,
+                "provider_slug": provider_slug,
+                "configured_fields_count": len(provider_config or ()),
+                "last_updated": last_updated,
+            }
+            for provider_slug, provider_config in integrations.items()
+        }
+
+        if agent_id:
+            # Reference to find the actual credentials in integration_credentials table
+            for provider_slug, provider_summary in summary.items():
+                provider_summary["configuration_reference"] = (
+                    f"agent_{agent_id}_provider_{provider_slug}"
+                )
+        return summary
+
     @staticmethod
     async def deactivate_agent_for_company(
         company_id: str, agent_id: str
     ) -> Dict[str, Any]:
         """Deactivate an agent for a company"""
         try:
-            result = (
+            result = await execute_query(
                 supabase.table("company_agents")
                 .update({"is_active": False})
                 .eq("company_id", company_id)
                 .eq("id", agent_id)
-                .execute()
             )
 
             return result.data[0] if result.data else {}
 
         except Exception as e:
             logger.error(
-                f"Error deactivating agent {agent_id} for company {company_id}: {e}"
+                "Error deactivating agent %s for company %s: %s",
+                agent_id,
+                company_id,
+                e,
             )
             raise
 
@@ -346,18 +229,46 @@ class AgentManagementService:
     ) -> Dict[str, Any]:
         """Toggle agent active status"""
         try:
-            result = (
+            result = await execute_query(
                 supabase.table("company_agents")
                 .update({"is_active": is_active})
                 .eq("company_id", company_id)
                 .eq("id", agent_id)
-                .execute()
             )
 
             return result.data[0] if result.data else {}
 
         except Exception as e:
-            logger.error(f"Error toggling agent {agent_id}: {e}")
+            logger.error("Error toggling agent %s: %s", agent_id, e)
+            raise
+
+    @staticmethod
+    async def toggle_agents_status(
+        company_id: str, changes: Dict[str, bool]
+    ) -> List[Dict[str, Any]]:
+        """Set the active status of several agents with one UPDATE per target status"""
+        try:
+            agent_ids_by_status: Dict[bool, List[str]] = {True: [], False: []}
+            for agent_id, is_active in changes.items():
+                agent_ids_by_status[is_active].append(agent_id)
+
+            updated_agents = []
+            for is_active, agent_ids in agent_ids_by_status.items():
+                if not agent_ids:
+                    continue
+
+                result = await execute_query(
+                    supabase.table("company_agents")
+                    .update({"is_active": is_active})
+                    .eq("company_id", company_id)
+                    .in_("id", agent_ids)
+                )
+                updated_agents.extend(result.data or [])
+
+            return updated_agents
+
+        except Exception as e:
+            logger.error("Error toggling agents for company %s: %s", company_id, e)
             raise
 
     @staticmethod
@@ -367,22 +278,17 @@ class AgentManagementService:
         """Update company agent configuration"""
         try:
             # Only allow updates to specific fields
-            allowed_fields = [
-                "custom_name",
-                "custom_prompt",
-                "selected_voice_id",
-                "language",
-                "configuration",
-                "monthly_limit",
-                "daily_limit",
-                "is_active",
-                "is_configured",
-            ]
-
-            update_data = {k: v for k, v in updates.items() if k in allowed_fields}
-
-            print(
-                f"🔄 Updating agent {agent_id} for company {company_id} with data: {update_data}"
+            update_data = {k: v for k, v in updates.items() if k in UPDATABLE_FIELDS}
+
+            # Nothing to write, skip before any logging or integration handling
+            if not update_data and not updates.get("integrations"):
+                return {}
+
+            logger.debug(
+                "Updating agent %s for company %s: %s",
+                agent_id,
+                company_id,
+                list(update_data),
             )
 
             # Extract integrations from configuration if they exist
@@ -390,16 +296,9 @@ class AgentManagementService:
             if update_data.get("configuration"):
                 # Check if configuration contains integration data
                 config = update_data["configuration"]
-                if isinstance(config, dict) and any(
-                    key in config
-                    for key in [
-                        "shopify",
-                        "woocommerce",
-                        "magento",
-                        "ticimax",
-                        "custom_booking",
-                    ]
-                ):
+                if isinstance(
+                    config, dict
+                ) and not INTEGRATION_PROVIDER_KEYS.isdisjoint(config):
                     integrations_to_save = config
 
             # Also check for direct integrations field
@@ -408,36 +307,27 @@ class AgentManagementService:
 
             # Update configuration with integration references only (no sensitive data)
             if integrations_to_save:
-                integration_summary = {}
-                for provider_slug, provider_config in integrations_to_save.items():
-                    integration_summary[provider_slug] = {
-                        "enabled": True,
-                        "provider_slug": provider_slug,
-                        "configured_fields_count": (
-                            len(provider_config.keys()) if provider_config else 0
-                        ),
-                        "last_updated": "now()",
-                        # Reference to find the actual credentials in integration_credentials table
-                        "configuration_reference": f"agent_{agent_id}_provider_{provider_slug}",
-                    }
-                update_data["configuration"] = {"integrations": integration_summary}
+                update_data["configuration"] = {
+                    "integrations": AgentManagementService._build_integration_summary(
+                        integrations_to_save, agent_id
+                    )
+                }
 
             if update_data:
-                result = (
+                result = await execute_query(
                     supabase.table("company_agents")
                     .update(update_data)
                     .eq("company_id", company_id)
                     .eq("id", agent_id)
-                    .execute()
                 )
 
                 # Save integrations to proper tables
                 if integrations_to_save:
-                    print(
-                        f"🔗 Saving integrations to proper tables: {integrations_to_save}"
-                    )
+                    logger.debug("Saving integrations of agent %s", agent_id)
                     await IntegrationService.save_agent_integrations(
-                        agent_id, integrations_to_save
+                        agent_id,
+                        integrations_to_save,
+                        result.data[0]["company_id"] if result.data else None,
                     )
 
                 return result.data[0] if result.data else {}
@@ -445,7 +335,7 @@ class AgentManagementService:
             return {}
 
         except Exception as e:
-            logger.error(f"Error updating company agent {agent_id}: {e}")
+            logger.error("Error updating company agent %s: %s", agent_id, e)
             raise
 
     @staticmethod
@@ -463,11 +353,11 @@ class AgentManagementService:
             if category:
                 query = query.eq("category", category)
 
-            result = query.order("name").execute()
+            result = await execute_query(query.order("name"))
             return result.data
 
         except Exception as e:
-            logger.error(f"Error fetching integration providers: {e}")
+            logger.error("Error fetching integration providers: %s", e)
             raise
 
 
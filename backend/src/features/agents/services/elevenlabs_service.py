@@ -1,60 +1,103 @@
+import asyncio
 import httpx
 import logging
-from typing import List, Dict, Any, Optional
+import re
+import orjson
+from typing import List, Dict, Any, Optional, Tuple
 from src.core.config import settings
-from src.core.database import supabase
+from src.core.database import supabase, execute_query
 from src.features.agents.models import (
     ElevenLabsVoice,
-    AgentVoiceResponse,
     SyncVoicesResponse,
 )
 
 logger = logging.getLogger(__name__)
 
+# agent_voices is unique on (provider, voice_id), see migration 002
+VOICE_CONFLICT_COLUMNS = "provider,voice_id"
+
+# Rows per upsert request, keeps payloads well under PostgREST limits
+VOICE_UPSERT_BATCH_SIZE = 500
+
+# Voices saved at once when a batch falls back to row-by-row upserts
+VOICE_SAVE_CONCURRENCY = 32
+
+# Columns backing AgentVoiceResponse
+VOICE_RESPONSE_COLUMNS = (
+    "id,name,provider,voice_id,language,gender,age_group,accent,"
+    "sample_url,is_premium,is_active,metadata,created_at,updated_at"
+)
+
+# Age keywords in voice labels, checked in this order within each descriptor
+AGE_GROUP_PATTERNS = (
+    ("young", re.compile("young", re.IGNORECASE)),
+    ("old", re.compile("old|elderly", re.IGNORECASE)),
+    ("middle", re.compile("middle", re.IGNORECASE)),
+)
+
+# Columns written by a voice sync, read back to skip unchanged voices
+VOICE_SYNC_COLUMNS = (
+    "name,provider,voice_id,language,gender,age_group,accent,"
+    "sample_url,is_premium,is_active,metadata"
+)
+
 
 class ElevenLabsService:
     """Service for ElevenLabs API integration"""
 
     def __init__(self):
         self.api_key = settings.elevenlabs_api_key
-        print(
-            f"🔑 Initializing ElevenLabsService with provided API key: {self.api_key}"
-        )
+        if not self.api_key:
+            logger.warning("ElevenLabs API key is not configured, voice fetches are disabled")
         self.base_url = "https://api.elevenlabs.io/v1"
         self.headers = {"xi-api-key": self.api_key, "Content-Type": "application/json"}
+        self._http: Optional[httpx.AsyncClient] = None
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        """Shared HTTP client reused across ElevenLabs API calls"""
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self.headers,
+                http2=True,
+                timeout=30.0,
+                limits=httpx.Limits(
+                    max_keepalive_connections=100, max_connections=1000
+                ),
+            )
+        return self._http
+
+    async def aclose(self) -> None:
+        """Close the shared HTTP client"""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
 
     async def fetch_voices_from_elevenlabs(self) -> List[ElevenLabsVoice]:
         """Fetch all voices from ElevenLabs API"""
+        if not self.api_key:
+            return []
+
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/voices", headers=self.headers, timeout=30.0
-                )
-                response.raise_for_status()
-
-                data = response.json()
-                voices = []
-
-                for voice_data in data.get("voices", []):
-                    voice = ElevenLabsVoice(
-                        voice_id=voice_data.get("voice_id"),
-                        name=voice_data.get("name"),
-                        category=voice_data.get("category"),
-                        labels=voice_data.get("labels", {}),
-                        description=voice_data.get("description"),
-                        preview_url=voice_data.get("preview_url"),
-                        available_for_tiers=voice_data.get("available_for_tiers", []),
-                        settings=voice_data.get("settings"),
-                    )
-                    voices.append(voice)
+            response = await self.http.get("/voices")
+            response.raise_for_status()
 
-                return voices
+            data = orjson.loads(response.content)
+            # Field names match the ElevenLabs keys, so build without re-validating
+            voices = []
+            for voice_data in data.get("voices", ()):
+                voice_data.setdefault("labels", {})
+                voice_data.setdefault("available_for_tiers", [])
+                voices.append(ElevenLabsVoice.model_construct(**voice_data))
+
+            return voices
 
         except httpx.HTTPError as e:
-            logger.error(f"HTTP error fetching voices from ElevenLabs: {e}")
+            logger.error("HTTP error fetching voices from ElevenLabs: %s", e)
             raise
         except Exception as e:
-            logger.error(f"Error fetching voices from ElevenLabs: {e}")
+            logger.error("Error fetching voices from ElevenLabs: %s", e)
             raise
 
     def _extract_voice_metadata(self, voice: ElevenLabsVoice) -> Dict[str, Any]:
@@ -73,14 +116,15 @@ class ElevenLabsService:
         age_descriptors = labels.get("descriptive", [])
         if isinstance(age_descriptors, list):
             for desc in age_descriptors:
-                if "young" in desc.lower():
-                    age_group = "young"
-                    break
-                elif "old" in desc.lower() or "elderly" in desc.lower():
-                    age_group = "old"
-                    break
-                elif "middle" in desc.lower():
-                    age_group = "middle"
+                age_group = next(
+                    (
+                        group
+                        for group, pattern in AGE_GROUP_PATTERNS
+                        if pattern.search(desc)
+                    ),
+                    None,
+                )
+                if age_group:
                     break
 
         # Extract accent from labels
@@ -99,75 +143,111 @@ class ElevenLabsService:
             "elevenlabs_category": voice.category,
         }
 
+    def _build_voice_row(self, voice: ElevenLabsVoice) -> Dict[str, Any]:
+        """Build the agent_voices row for an ElevenLabs voice"""
+        metadata = self._extract_voice_metadata(voice)
+
+        return {
+            "name": voice.name,
+            "provider": "elevenlabs",
+            "voice_id": voice.voice_id,
+            "language": "tr-TR",  # Default to Turkish, can be updated later
+            "gender": metadata.get("gender"),
+            "age_group": metadata.get("age_group"),
+            "accent": metadata.get("accent"),
+            "sample_url": voice.preview_url,
+            "is_premium": metadata.get("is_premium", False),
+            "is_active": True,
+            "metadata": {
+                "elevenlabs_labels": metadata.get("elevenlabs_labels"),
+                "elevenlabs_settings": metadata.get("elevenlabs_settings"),
+                "elevenlabs_category": metadata.get("elevenlabs_category"),
+                "description": voice.description,
+            },
+        }
+
+    async def _load_existing_voice_rows(self) -> Dict[str, Dict[str, Any]]:
+        """Load the stored ElevenLabs voices once, keyed by voice_id"""
+        result = await execute_query(
+            supabase.table("agent_voices")
+            .select(VOICE_SYNC_COLUMNS)
+            .eq("provider", "elevenlabs")
+        )
+        return {row["voice_id"]: row for row in result.data or []}
+
     async def save_voice_to_database(self, voice: ElevenLabsVoice) -> bool:
         """Save a voice to the database"""
         try:
-            metadata = self._extract_voice_metadata(voice)
-
-            voice_data = {
-                "name": voice.name,
-                "provider": "elevenlabs",
-                "voice_id": voice.voice_id,
-                "language": "tr-TR",  # Default to Turkish, can be updated later
-                "gender": metadata.get("gender"),
-                "age_group": metadata.get("age_group"),
-                "accent": metadata.get("accent"),
-                "sample_url": voice.preview_url,
-                "is_premium": metadata.get("is_premium", False),
-                "is_active": True,
-                "metadata": {
-                    "elevenlabs_labels": metadata.get("elevenlabs_labels"),
-                    "elevenlabs_settings": metadata.get("elevenlabs_settings"),
-                    "elevenlabs_category": metadata.get("elevenlabs_category"),
-                    "description": voice.description,
-                },
-            }
-
-            # Check if voice already exists
-            existing = (
-                supabase.table("agent_voices")
-                .select("id")
-                .eq("voice_id", voice.voice_id)
-                .eq("provider", "elevenlabs")
-                .execute()
+            await execute_query(
+                supabase.table("agent_voices").upsert(
+                    self._build_voice_row(voice), on_conflict=VOICE_CONFLICT_COLUMNS
+                )
             )
 
-            if existing.data:
-                # Update existing voice
-                supabase.table("agent_voices").update(voice_data).eq(
-                    "voice_id", voice.voice_id
-                ).eq("provider", "elevenlabs").execute()
-            else:
-                # Insert new voice
-                supabase.table("agent_voices").insert(voice_data).execute()
-
             return True
 
         except Exception as e:
-            logger.error(f"Error saving voice {voice.voice_id} to database: {e}")
+            logger.error("Error saving voice %s to database: %s", voice.voice_id, e)
             return False
 
     async def sync_voices_from_elevenlabs(self) -> SyncVoicesResponse:
         """Sync all voices from ElevenLabs to database"""
         try:
-            # Fetch voices from ElevenLabs
-            voices = await self.fetch_voices_from_elevenlabs()
+            # Fetch voices from ElevenLabs while the stored rows load
+            voices, existing_rows = await asyncio.gather(
+                self.fetch_voices_from_elevenlabs(), self._load_existing_voice_rows()
+            )
 
             synced_count = 0
             skipped_count = 0
             errors = []
 
+            # Voices whose stored row already matches need no write
+            changed_voices = []
             for voice in voices:
+                if existing_rows.get(voice.voice_id) == self._build_voice_row(voice):
+                    synced_count += 1
+                else:
+                    changed_voices.append(voice)
+            voices = changed_voices
+
+            for start in range(0, len(voices), VOICE_UPSERT_BATCH_SIZE):
+                batch = voices[start : start + VOICE_UPSERT_BATCH_SIZE]
+
                 try:
-                    success = await self.save_voice_to_database(voice)
-                    if success:
+                    # One set-based INSERT ... ON CONFLICT per batch, see migration 004
+                    await execute_query(
+                        supabase.rpc(
+                            "bulk_upsert_voices",
+                            {"payload": [self._build_voice_row(voice) for voice in batch]},
+                        )
+                    )
+                    synced_count += len(batch)
+                    continue
+                except Exception as e:
+                    logger.error("Bulk voice upsert failed, retrying one by one: %s", e)
+
+                # Slow path isolates the voices that make the batch fail,
+                # saving them concurrently with a bounded number in flight
+                semaphore = asyncio.Semaphore(VOICE_SAVE_CONCURRENCY)
+
+                async def save_voice(voice: ElevenLabsVoice) -> bool:
+                    async with semaphore:
+                        return await self.save_voice_to_database(voice)
+
+                results = await asyncio.gather(
+                    *[save_voice(voice) for voice in batch], return_exceptions=True
+                )
+
+                for voice, result in zip(batch, results):
+                    if isinstance(result, Exception):
+                        skipped_count += 1
+                        errors.append(f"Error processing voice {voice.name}: {str(result)}")
+                    elif result:
                         synced_count += 1
                     else:
                         skipped_count += 1
                         errors.append(f"Failed to save voice: {voice.name}")
-                except Exception as e:
-                    skipped_count += 1
-                    errors.append(f"Error processing voice {voice.name}: {str(e)}")
 
             return SyncVoicesResponse(
                 success=True,
@@ -178,7 +258,7 @@ class ElevenLabsService:
             )
 
         except Exception as e:
-            logger.error(f"Error syncing voices: {e}")
+            logger.error("Error syncing voices: %s", e)
             return SyncVoicesResponse(
                 success=False,
                 message=f"Sync failed: {str(e)}",
@@ -188,41 +268,45 @@ class ElevenLabsService:
             )
 
     async def get_voices_from_database(
-        self, is_active: Optional[bool] = True
-    ) -> List[AgentVoiceResponse]:
-        """Get voices from database"""
+        self,
+        is_active: Optional[bool] = True,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Get voices from database, one page at a time when a limit is given
+
+        Returns the rows along with the number of voices matching the filter.
+        """
         try:
-            query = supabase.table("agent_voices").select("*")
+            # A page needs the total counted by the same query, a full list is its own total
+            query = supabase.table("agent_voices").select(
+                VOICE_RESPONSE_COLUMNS, count="exact" if limit is not None else None
+            )
 
             if is_active is not None:
                 query = query.eq("is_active", is_active)
 
-            result = query.order("name").execute()
+            # id breaks ties between same-named voices so pages never overlap
+            query = query.order("name").order("id")
+            if limit is not None:
+                query = query.range(offset, offset + limit - 1)
 
-            voices = []
-            for voice_data in result.data:
-                voice = AgentVoiceResponse(
-                    id=voice_data["id"],
-                    name=voice_data["name"],
-                    provider=voice_data["provider"],
-                    voice_id=voice_data["voice_id"],
-                    language=voice_data["language"],
-                    gender=voice_data.get("gender"),
-                    age_group=voice_data.get("age_group"),
-                    accent=voice_data.get("accent"),
-                    sample_url=voice_data.get("sample_url"),
-                    is_premium=voice_data.get("is_premium", False),
-                    is_active=voice_data.get("is_active", True),
-                    metadata=voice_data.get("metadata"),
-                    created_at=voice_data["created_at"],
-                    updated_at=voice_data["updated_at"],
-                )
-                voices.append(voice)
+            result = await execute_query(query)
 
-            return voices
+            # Rows already have the AgentVoiceResponse shape, only the
+            # nullable flags need the model defaults
+            for row in result.data:
+                if row.get("is_premium") is None:
+                    row["is_premium"] = False
+                if row.get("is_active") is None:
+                    row["is_active"] = True
+
+            total = result.count if result.count is not None else len(result.data)
+            return result.data, total
 
         except Exception as e:
-            logger.error(f"Error fetching voices from database: {e}")
+            logger.error("Error fetching voices from database: %s", e)
             raise
 
 
@@ -231,7 +315,6 @@ elevenlabs_service = ElevenLabsService()
 
 
 if __name__ == "__main__":
-    import asyncio
 
     async def main():
         """
@@ -1,225 +1,263 @@
+import asyncio
 import httpx
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Set, Tuple
 
-from src.core.database import supabase
+from src.core.database import supabase, execute_query
+from src.core.cache import ttl_cached
 
 
 logger = logging.getLogger(__name__)
 
+# Seconds the slug -> provider lookup is reused before re-reading Supabase
+PROVIDER_LOOKUP_TTL = 60
+
+# integration_credentials is unique on (configuration_id, credential_key), see migration 006
+CREDENTIAL_CONFLICT_COLUMNS = "configuration_id,credential_key"
+
+# agent_integration_links is unique on (agent_id, configuration_id), see migration 007
+LINK_CONFLICT_COLUMNS = "agent_id,configuration_id"
+
+# Enabled links embedding each provider slug and its credentials
+AGENT_CREDENTIALS_SELECT = (
+    "company_integration_configurations!inner("
+    "integration_providers!inner(slug),"
+    "integration_credentials(credential_key,encrypted_value))"
+)
+
 
 class IntegrationService:
     """Service for managing integration configurations and API keys"""
 
     @staticmethod
-    async def save_agent_integrations(agent_id: str, integrations: Dict[str, Any]):
+    async def save_agent_integrations(
+        agent_id: str, integrations: Dict[str, Any], company_id: Optional[str] = None
+    ):
         """Save integration configurations for an agent with encrypted API keys"""
         try:
-            # Get company_id from agent
-            agent_result = (
-                supabase.table("company_agents")
-                .select("company_id")
-                .eq("id", agent_id)
-                .execute()
-            )
+            # Get company_id from agent unless the caller already has it
+            if company_id is None:
+                agent_result = await execute_query(
+                    supabase.table("company_agents")
+                    .select("company_id")
+                    .eq("id", agent_id)
+                )
 
-            if not agent_result.data:
-                raise ValueError("Agent not found")
+                if not agent_result.data:
+                    raise ValueError("Agent not found")
 
-            company_id = agent_result.data[0]["company_id"]
+                company_id = agent_result.data[0]["company_id"]
 
-            print(
-                f"🔑 Saving integrations for agent {agent_id} of company {company_id}"
+            logger.debug(
+                "Saving integrations for agent %s of company %s", agent_id, company_id
             )
 
+            providers = await IntegrationService._get_providers_by_slug()
+
+            # provider_id -> (provider_slug, config) for every usable integration
+            provider_configs = {}
             for provider_slug, config in integrations.items():
                 if not config or not isinstance(config, dict):
-                    print(f"⚠️ Skipping invalid config for {provider_slug}: {config}")
+                    logger.warning("Skipping invalid config for %s", provider_slug)
                     continue
 
-                print(f"🔍 Processing integration for provider: {provider_slug}")
-
                 # Get provider info
-                provider_result = (
-                    supabase.table("integration_providers")
-                    .select("id, required_fields")
-                    .eq("slug", provider_slug)
-                    .execute()
-                )
+                provider = providers.get(provider_slug)
 
-                if not provider_result.data:
-                    print(f"❌ Provider not found for slug: {provider_slug}")
+                if not provider:
+                    logger.warning("Provider not found for slug: %s", provider_slug)
                     continue
 
-                print(f"✅ Found provider: {provider_result.data[0]}")
+                provider_configs[provider["id"]] = (provider_slug, config)
 
-                provider_id = provider_result.data[0]["id"]
-                print(f"🆔 Using provider_id: {provider_id}")
-
-                # Create or update company integration configuration
-                company_integration_result = (
-                    supabase.table("company_integration_configurations")
-                    .select("id")
-                    .eq("company_id", company_id)
-                    .eq("provider_id", provider_id)
-                    .execute()
-                )
+            (
+                configuration_ids,
+                created_configuration_ids,
+            ) = await IntegrationService._ensure_company_configurations(
+                company_id, provider_configs
+            )
 
-                if company_integration_result.data:
-                    # Update existing configuration
-                    configuration_id = company_integration_result.data[0]["id"]
-                    print(f"🔄 Using existing configuration: {configuration_id}")
-                else:
-                    # Create new configuration
-                    new_config = {
-                        "company_id": company_id,
-                        "provider_id": provider_id,
-                        "configuration_name": f"{provider_slug}_config",
-                        "is_active": True,
-                        "is_default": True,
-                    }
-
-                    print(f"🆕 Creating new configuration: {new_config}")
-
-                    create_result = (
-                        supabase.table("company_integration_configurations")
-                        .insert(new_config)
-                        .execute()
+            credential_saves = {}
+            for provider_id, (provider_slug, config) in provider_configs.items():
+                configuration_id = configuration_ids.get(provider_id)
+                if not configuration_id:
+                    logger.error(
+                        "Failed to create %s configuration for company %s",
+                        provider_slug,
+                        company_id,
                     )
+                    continue
 
-                    if create_result.data:
-                        configuration_id = create_result.data[0]["id"]
-                        print(f"✅ Created new configuration: {configuration_id}")
-                    else:
-                        print(f"❌ Failed to create configuration: {create_result}")
-                        continue
-
-                # Save encrypted credentials
-                print(f"💾 Saving credentials for config {configuration_id}: {config}")
-                await IntegrationService._save_encrypted_credentials(
-                    configuration_id, config
-                )
+                credential_saves[configuration_id] = config
 
-                # Link agent to integration
-                print(
-                    f"🔗 Linking agent {agent_id} to configuration {configuration_id}"
+            # Save encrypted credentials, configurations are independent of each other
+            await asyncio.gather(
+                *(
+                    IntegrationService._save_encrypted_credentials(
+                        configuration_id,
+                        config,
+                        prune_stale=configuration_id not in created_configuration_ids,
+                    )
+                    for configuration_id, config in credential_saves.items()
+                )
+            )
+            linked_configuration_ids = list(credential_saves)
+
+            # Link agent to every saved integration at once
+            if linked_configuration_ids:
+                logger.debug(
+                    "Linking agent %s to configurations %s",
+                    agent_id,
+                    linked_configuration_ids,
                 )
-                await IntegrationService._link_agent_to_integration(
-                    agent_id, configuration_id
+                await IntegrationService._link_agent_to_integrations(
+                    agent_id, linked_configuration_ids
                 )
 
         except Exception as e:
-            logger.error(f"Error saving agent integrations: {e}")
+            logger.error("Error saving agent integrations: %s", e)
             raise
 
+    @staticmethod
+    async def _ensure_company_configurations(
+        company_id: str, provider_configs: Dict[str, Any]
+    ) -> Tuple[Dict[str, str], Set[str]]:
+        """
+        Company integration configuration ids keyed by provider, creating missing ones
+
+        Also returns the ids created by this call, which cannot hold credentials yet.
+        """
+        if not provider_configs:
+            return {}, set()
+
+        # Existing configurations are reused as they are
+        existing = await execute_query(
+            supabase.table("company_integration_configurations")
+            .select("id, provider_id")
+            .eq("company_id", company_id)
+            .in_("provider_id", list(provider_configs))
+        )
+        configuration_ids = {}
+        created_ids = set()
+        for row in existing.data or []:
+            configuration_ids.setdefault(row["provider_id"], row["id"])
+
+        # Create the rest in one request
+        new_configs = [
+            {
+                "company_id": company_id,
+                "provider_id": provider_id,
+                "configuration_name": f"{provider_slug}_config",
+                "is_active": True,
+                "is_default": True,
+            }
+            for provider_id, (provider_slug, _) in provider_configs.items()
+            if provider_id not in configuration_ids
+        ]
+        if new_configs:
+            logger.debug("Creating new configurations: %s", new_configs)
+            created = await execute_query(
+                supabase.table("company_integration_configurations").insert(new_configs)
+            )
+            for row in created.data or []:
+                configuration_ids[row["provider_id"]] = row["id"]
+                created_ids.add(row["id"])
+
+        return configuration_ids, created_ids
+
+    @staticmethod
+    @ttl_cached("integrations:providers:by_slug", PROVIDER_LOOKUP_TTL)
+    async def _get_providers_by_slug() -> Dict[str, Dict[str, Any]]:
+        """All integration providers keyed by slug"""
+        result = await execute_query(
+            supabase.table("integration_providers").select("id, slug, required_fields")
+        )
+        return {provider["slug"]: provider for provider in result.data or []}
+
     @staticmethod
     async def _save_encrypted_credentials(
-        configuration_id: str, config: Dict[str, Any]
+        configuration_id: str, config: Dict[str, Any], prune_stale: bool = True
     ):
         """Save encrypted credentials for an integration configuration"""
         try:
-            print(f"🗑️ Deleting existing credentials for config: {configuration_id}")
-            # Delete existing credentials
-            delete_result = (
-                supabase.table("integration_credentials")
-                .delete()
-                .eq("configuration_id", configuration_id)
-                .execute()
-            )
-            print(f"🗑️ Delete result: {delete_result}")
-
-            # Save new credentials
+            credential_rows = []
             for key, value in config.items():
                 if value and isinstance(value, str):
-                    credential_data = {
-                        "configuration_id": configuration_id,
-                        "credential_key": key,
-                        "encrypted_value": value,  # In production, this should be encrypted
-                    }
-
-                    print(f"💾 Saving credential: {key} for config {configuration_id}")
-                    insert_result = (
-                        supabase.table("integration_credentials")
-                        .insert(credential_data)
-                        .execute()
+                    credential_rows.append(
+                        {
+                            "configuration_id": configuration_id,
+                            "credential_key": key,
+                            "encrypted_value": value,  # In production, this should be encrypted
+                        }
                     )
-                    print(f"💾 Insert result: {insert_result}")
                 else:
-                    print(f"⚠️ Skipping invalid credential: {key} = {value}")
+                    logger.warning("Skipping invalid credential: %s", key)
+
+            # Write every credential in one request, see migration 006
+            if credential_rows:
+                logger.debug(
+                    "Saving %d credentials for config %s",
+                    len(credential_rows),
+                    configuration_id,
+                )
+                await execute_query(
+                    supabase.table("integration_credentials").upsert(
+                        credential_rows, on_conflict=CREDENTIAL_CONFLICT_COLUMNS
+                    )
+                )
 
-        except Exception as e:
-            logger.error(f"Error saving encrypted credentials: {e}")
-            print(f"❌ Error in _save_encrypted_credentials: {e}")
-            raise
+            # Drop credentials that are no longer part of the configuration
+            if not prune_stale:
+                return
 
-    @staticmethod
-    async def _link_agent_to_integration(agent_id: str, configuration_id: str):
-        """Link agent to integration configuration"""
-        try:
-            print(
-                f"🔍 Checking existing link for agent {agent_id} and config {configuration_id}"
-            )
-            # Check if link already exists
-            existing_link = (
-                supabase.table("agent_integration_links")
-                .select("id")
-                .eq("agent_id", agent_id)
+            stale_query = (
+                supabase.table("integration_credentials")
+                .delete()
                 .eq("configuration_id", configuration_id)
-                .execute()
             )
+            if credential_rows:
+                stale_query = stale_query.not_.in_(
+                    "credential_key", [row["credential_key"] for row in credential_rows]
+                )
+            await execute_query(stale_query)
 
-            print(f"🔍 Existing link result: {existing_link}")
-
-            if not existing_link.data:
-                # Create new link
-                link_data = {
-                    "agent_id": agent_id,
-                    "configuration_id": configuration_id,
-                    "is_enabled": True,
-                    "permissions": {},
-                }
+        except Exception as e:
+            logger.error("Error saving encrypted credentials: %s", e)
+            raise
 
-                print(f"🆕 Creating new link: {link_data}")
-                link_result = (
-                    supabase.table("agent_integration_links")
-                    .insert(link_data)
-                    .execute()
-                )
-                print(f"✅ Link created: {link_result}")
-            else:
-                # Update existing link to enabled
-                print(f"🔄 Updating existing link to enabled")
-                update_result = (
-                    supabase.table("agent_integration_links")
-                    .update({"is_enabled": True})
-                    .eq("id", existing_link.data[0]["id"])
-                    .execute()
+    @staticmethod
+    async def _link_agent_to_integrations(agent_id: str, configuration_ids: List[str]):
+        """Link agent to integration configurations, enabling existing links"""
+        try:
+            # New links get the default empty permissions, existing ones keep theirs
+            await execute_query(
+                supabase.table("agent_integration_links").upsert(
+                    [
+                        {
+                            "agent_id": agent_id,
+                            "configuration_id": configuration_id,
+                            "is_enabled": True,
+                        }
+                        for configuration_id in configuration_ids
+                    ],
+                    on_conflict=LINK_CONFLICT_COLUMNS,
                 )
-                print(f"✅ Link updated: {update_result}")
+            )
 
         except Exception as e:
-            logger.error(f"Error linking agent to integration: {e}")
-            print(f"❌ Error in _link_agent_to_integration: {e}")
+            logger.error("Error linking agent to integration: %s", e)
             raise
 
     @staticmethod
     async def get_agent_integrations(agent_id: str) -> Dict[str, Any]:
         """Get integration configurations for an agent"""
         try:
-            result = (
+            # Credentials come embedded with each link, one round trip for all providers
+            result = await execute_query(
                 supabase.table("agent_integration_links")
-                .select(
-                    """
-                    *,
-                    company_integration_configurations!inner(
-                        *,
-                        integration_providers!inner(name, slug, required_fields)
-                    )
-                """
-                )
+                .select(AGENT_CREDENTIALS_SELECT)
                 .eq("agent_id", agent_id)
                 .eq("is_enabled", True)
-                .execute()
             )
 
             integrations = {}
@@ -228,21 +266,13 @@ class IntegrationService:
                 provider = config["integration_providers"]
 
                 # Get decrypted credentials (simplified for now)
-                credentials_result = (
-                    supabase.table("integration_credentials")
-                    .select("credential_key, encrypted_value")
-                    .eq("configuration_id", config["id"])
-                    .execute()
-                )
-
-                credentials = {}
-                for cred in credentials_result.data or []:
-                    credentials[cred["credential_key"]] = cred["encrypted_value"]
-
-                integrations[provider["slug"]] = credentials
+                integrations[provider["slug"]] = {
+                    cred["credential_key"]: cred["encrypted_value"]
+                    for cred in config.get("integration_credentials") or []
+                }
 
             return integrations
 
         except Exception as e:
-            logger.error(f"Error getting agent integrations: {e}")
+            logger.error("Error getting agent integrations: %s", e)
             return {}
@@ -1,9 +1,8 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jose import JWTError, jwt
 from .repository import AuthRepository
 from .service import AuthService
-from ..shared.database.supabase_client import supabase
+from src.core.security import get_user_from_token
 
 security = HTTPBearer()
 
@@ -23,14 +22,7 @@ async def get_current_user(
 ) -> dict:
     try:
         # Supabase JWT token'ını verify et
-        response = supabase.auth.get_user(credentials.credentials)
-        if not response.user:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid authentication credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        return response.user
+        return await get_user_from_token(credentials.credentials)
     except Exception:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -1,3 +1,6 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
 from supabase import Client
 from gotrue.errors import AuthApiError
 from typing import Optional, Dict, Any
@@ -7,25 +10,29 @@ from .schemas import (
     LoginRequest,
     ProfileUpdateRequest,
 )
-from ..shared.database.supabase_client import supabase, get_supabase_client
+from ..shared.database.supabase_client import supabase, supabase_admin
+from src.core.database import execute_query
+
+logger = logging.getLogger(__name__)
 
 
 class AuthRepository:
-    def __init__(self, client: Client = supabase):
+    def __init__(self, client: Client = supabase, admin_client: Client = supabase_admin):
         self.client = client
-        # Service role client for admin operations
-        self.admin_client = get_supabase_client()
+        # Service role client for admin operations, shared so its connections are reused
+        self.admin_client = admin_client
 
     async def register_user(self, request: RegisterRequest) -> Dict[str, Any]:
         try:
-            response = self.client.auth.sign_up(
+            response = await asyncio.to_thread(
+                self.client.auth.sign_up,
                 {
                     "email": request.email,
                     "password": request.password,
                     "options": {"data": {"full_name": request.full_name}},
                 }
             )
-            return response.dict()
+            return response.model_dump()
         except AuthApiError as e:
             raise ValueError(f"Registration failed: {e.message}")
 
@@ -35,7 +42,8 @@ class AuthRepository:
         try:
             print(f"DEBUG: Attempting admin user creation for: {request.email}")
             # Use admin client with service role for user creation without email confirmation
-            admin_response = self.admin_client.auth.admin.create_user(
+            admin_response = await asyncio.to_thread(
+                self.admin_client.auth.admin.create_user,
                 {
                     "email": request.email,
                     "password": request.password,
@@ -50,8 +58,9 @@ class AuthRepository:
                 raise ValueError("User creation failed")
 
             # Since admin API doesn't return session, we need to sign in the user
-            auth_response = self.client.auth.sign_in_with_password(
-                {"email": request.email, "password": request.password}
+            auth_response = await asyncio.to_thread(
+                self.client.auth.sign_in_with_password,
+                {"email": request.email, "password": request.password},
             )
 
             if not auth_response.user:
@@ -66,10 +75,8 @@ class AuthRepository:
             }
 
             try:
-                company_response = (
-                    self.admin_client.table("company_profile")
-                    .insert(company_data)
-                    .execute()
+                company_response = await execute_query(
+                    self.admin_client.table("company_profile").insert(company_data)
                 )
 
                 if not company_response.data:
@@ -82,7 +89,7 @@ class AuthRepository:
                     f"Warning: Company profile table not found or creation failed for user {auth_response.user.id}: {str(company_error)}"
                 )
 
-            return auth_response.dict()
+            return auth_response.model_dump()
 
         except AuthApiError as e:
             raise ValueError(f"Business registration failed: {e.message}")
@@ -91,36 +98,41 @@ class AuthRepository:
 
     async def login_user(self, request: LoginRequest) -> Dict[str, Any]:
         try:
-            response = self.client.auth.sign_in_with_password(
-                {"email": request.email, "password": request.password}
+            response = await asyncio.to_thread(
+                self.client.auth.sign_in_with_password,
+                {"email": request.email, "password": request.password},
             )
-            return response.dict()
+            return response.model_dump()
         except AuthApiError as e:
             raise ValueError(f"Login failed: {e.message}")
 
     async def refresh_token(self, refresh_token: str) -> Dict[str, Any]:
         try:
-            response = self.client.auth.refresh_session(refresh_token)
-            return response.dict()
+            response = await asyncio.to_thread(
+                self.client.auth.refresh_session, refresh_token
+            )
+            return response.model_dump()
         except AuthApiError as e:
             raise ValueError(f"Token refresh failed: {e.message}")
 
     async def logout_user(self, access_token: str) -> bool:
         try:
-            self.client.auth.sign_out(access_token)
+            await asyncio.to_thread(self.client.auth.sign_out, access_token)
             return True
         except AuthApiError:
             return False
 
     async def get_user_profile(self, user_id: str) -> Optional[Dict[str, Any]]:
         try:
-            # Get company profile (this is our main profile table)
-            company_response = (
-                self.client.table("company_profile")
-                .select("*")
-                .eq("user_id", user_id)
-                .single()
-                .execute()
+            # Company profile (our main profile table) and auth user are independent
+            company_response, user_info = await asyncio.gather(
+                execute_query(
+                    self.client.table("company_profile")
+                    .select("*")
+                    .eq("user_id", user_id)
+                    .single()
+                ),
+                self._get_auth_user(user_id),
             )
 
             if not company_response.data:
@@ -128,16 +140,11 @@ class AuthRepository:
 
             profile_data = company_response.data
 
-            # Get user info from Supabase auth using admin client
-            try:
-                user_info = self.admin_client.auth.admin.get_user_by_id(user_id)
-                if user_info and user_info.user:
-                    profile_data["email"] = user_info.user.email
-                    profile_data["full_name"] = user_info.user.user_metadata.get(
-                        "full_name", ""
-                    )
-            except Exception as e:
-                print(f"Warning: Could not fetch user auth info: {e}")
+            if user_info and user_info.user:
+                profile_data["email"] = user_info.user.email
+                profile_data["full_name"] = user_info.user.user_metadata.get(
+                    "full_name", ""
+                )
 
             # Structure the response to match expected format
             return {
@@ -163,11 +170,21 @@ class AuthRepository:
             print(f"Error fetching user profile: {str(e)}")
             return None
 
+    async def _get_auth_user(self, user_id: str):
+        """Get user info from Supabase auth using admin client, None if unavailable"""
+        try:
+            return await asyncio.to_thread(
+                self.admin_client.auth.admin.get_user_by_id, user_id
+            )
+        except Exception as e:
+            logger.warning("Could not fetch user auth info: %s", e)
+            return None
+
     async def update_user_profile(
         self, user_id: str, request: ProfileUpdateRequest
     ) -> Dict[str, Any]:
         try:
-            update_data = request.dict(exclude_unset=True)
+            update_data = request.model_dump(exclude_unset=True)
 
             # All profile data goes to company_profile table
             # Only include fields that exist in the current schema
@@ -188,7 +205,8 @@ class AuthRepository:
             # Update user metadata in Supabase auth if full_name is provided using admin client
             if "full_name" in update_data:
                 try:
-                    self.admin_client.auth.admin.update_user_by_id(
+                    await asyncio.to_thread(
+                        self.admin_client.auth.admin.update_user_by_id,
                         user_id,
                         {"user_metadata": {"full_name": update_data["full_name"]}},
                     )
@@ -197,12 +215,11 @@ class AuthRepository:
 
             # Update company profile if there are company fields
             if company_fields:
-                company_fields["updated_at"] = "NOW()"
-                (
+                company_fields["updated_at"] = datetime.now(timezone.utc).isoformat()
+                await execute_query(
                     self.client.table("company_profile")
                     .update(company_fields)
                     .eq("user_id", user_id)
-                    .execute()
                 )
 
             # Return updated profile
@@ -212,7 +229,9 @@ class AuthRepository:
 
     async def change_password(self, access_token: str, new_password: str) -> bool:
         try:
-            self.client.auth.update_user({"password": new_password}, access_token)
+            await asyncio.to_thread(
+                self.client.auth.update_user, {"password": new_password}, access_token
+            )
             return True
         except AuthApiError:
             return False
@@ -33,15 +33,7 @@ async def register_business(
     auth_service: AuthService = Depends(get_auth_service),
 ):
     """Register a new business user with company profile"""
-    try:
-        print(f"DEBUG: Received business registration request: {request}")
-        print(f"DEBUG: Request type: {type(request)}")
-        print(f"DEBUG: Request dict: {request.dict()}")
-        return await auth_service.register_business(request)
-    except Exception as e:
-        print(f"DEBUG: Exception in register_business: {e}")
-        print(f"DEBUG: Exception type: {type(e)}")
-        raise e
+    return await auth_service.register_business(request)
 
 
 @router.post("/login", response_model=AuthResponse)
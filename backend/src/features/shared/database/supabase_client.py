@@ -1,15 +1,18 @@
-from supabase import create_client, Client
+from supabase import Client
 from src.core.config import settings
+from src.core.supabase_client import create_supabase_client
 
 
 def get_supabase_client() -> Client:
-    return create_client(settings.supabase_url, settings.supabase_service_key)
+    return create_supabase_client(settings.supabase_url, settings.supabase_service_key)
 
 
 def get_supabase_anon_client() -> Client:
-    return create_client(settings.supabase_url, settings.supabase_anon_key)
+    return create_supabase_client(settings.supabase_url, settings.supabase_anon_key)
 
 
 # Singleton instances
 supabase: Client = get_supabase_client()
+# Kept apart from `supabase`, whose auth session changes on sign-in
+supabase_admin: Client = get_supabase_client()
 supabase_anon: Client = get_supabase_anon_client()
@@ -1,28 +1,20 @@
 from fastapi import HTTPException, Depends, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from src.core.database import supabase
+from src.core.database import supabase, execute_query
+from src.core.security import get_user_from_token
 
 security = HTTPBearer()
 
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+):
     """
     Get current user from JWT token
     """
     try:
-        token = credentials.credentials
-
-        # Verify token with Supabase
-        user = supabase.auth.get_user(token)
-
-        if not user or not user.user:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid authentication credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-
-        return user.user
+        # Verified locally when SUPABASE_JWT_SECRET is set, otherwise by Supabase auth
+        return await get_user_from_token(credentials.credentials)
 
     except Exception:
         raise HTTPException(
@@ -38,11 +30,8 @@ async def get_company_id_from_user(user=Depends(get_current_user)) -> str:
     """
     try:
         # Get company profile for the user
-        result = (
-            supabase.table("company_profile")
-            .select("id")
-            .eq("user_id", user.id)
-            .execute()
+        result = await execute_query(
+            supabase.table("company_profile").select("id").eq("user_id", user.id)
         )
 
         if not result.data:
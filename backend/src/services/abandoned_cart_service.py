@@ -4,6 +4,7 @@ Specialized service for handling abandoned cart recovery agents
 """
 
 from typing import Dict, Any, List, Optional
+import httpx
 from src.services.agent_integration_service_v2 import AgentIntegrationService
 from src.services.integration_service import IntegrationService
 import time
@@ -20,6 +21,26 @@ class AbandonedCartAgentService:
         self.agent_service = AgentIntegrationService()
         self.integration_service = IntegrationService()
         self.target_template_slug = "ecommerce-abandoned-cart"
+        self._http: Optional[httpx.AsyncClient] = None
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        """Shared HTTP client reused for every external API call"""
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                http2=True,
+                timeout=30.0,
+                limits=httpx.Limits(
+                    max_keepalive_connections=100, max_connections=200
+                ),
+            )
+        return self._http
+
+    async def aclose(self) -> None:
+        """Close the shared HTTP client"""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
 
     async def get_abandoned_cart_agents(self) -> List[Dict[str, Any]]:
         """
@@ -49,7 +70,8 @@ class AbandonedCartAgentService:
 
         except Exception as e:
             print(f"❌ Error fetching abandoned cart agents: {str(e)}")
-            return []
+            # Re-raised so callers (and the response cache) never mistake it for no agents
+            raise
 
     async def initialize_abandoned_cart_integrations(self) -> Dict[str, Any]:
         """
@@ -213,6 +235,16 @@ class AbandonedCartAgentService:
             "mock_data": True,
         }
 
+    async def _find_abandoned_cart_agent(
+        self, agent_id: str
+    ) -> Optional[Dict[str, Any]]:
+        """Look up a single abandoned cart agent by id"""
+        all_agents = await self.get_abandoned_cart_agents()
+        for agent in all_agents:
+            if agent["agent_id"] == agent_id:
+                return agent
+        return None
+
     async def fetch_abandoned_cart_data(
         self, agent_id: str, provider_slug: str
     ) -> Dict[str, Any]:
@@ -227,17 +259,8 @@ class AbandonedCartAgentService:
             Dict containing abandoned cart data
         """
         try:
-            # For now, we'll generate mock data
-            # In real implementation, this would fetch actual abandoned carts from the platform
-
             # Get agent info first
-            all_agents = await self.get_abandoned_cart_agents()
-            agent_info = None
-
-            for agent in all_agents:
-                if agent["agent_id"] == agent_id:
-                    agent_info = agent
-                    break
+            agent_info = await self._find_abandoned_cart_agent(agent_id)
 
             if not agent_info:
                 return {
@@ -246,6 +269,25 @@ class AbandonedCartAgentService:
                     "data": None,
                 }
 
+            return self._fetch_abandoned_cart_data_for(agent_info, provider_slug)
+
+        except Exception as e:
+            return {
+                "success": False,
+                "message": f"Error fetching abandoned cart data: {str(e)}",
+                "data": None,
+                "agent_id": agent_id,
+                "provider_slug": provider_slug,
+            }
+
+    def _fetch_abandoned_cart_data_for(
+        self, agent_info: Dict[str, Any], provider_slug: str
+    ) -> Dict[str, Any]:
+        """Fetch abandoned cart data for an already loaded agent"""
+        agent_id = agent_info["agent_id"]
+        try:
+            # For now, we'll generate mock data
+            # In real implementation, this would fetch actual abandoned carts from the platform
             company_info = agent_info.get("company_info", {})
 
             # Generate mock data
@@ -281,16 +323,8 @@ class AbandonedCartAgentService:
             Dict containing complete payload for external API
         """
         try:
-            print(f"📦 Creating abandoned cart payload for agent {agent_id}")
-
             # Get agent information
-            all_agents = await self.get_abandoned_cart_agents()
-            agent_info = None
-
-            for agent in all_agents:
-                if agent["agent_id"] == agent_id:
-                    agent_info = agent
-                    break
+            agent_info = await self._find_abandoned_cart_agent(agent_id)
 
             if not agent_info:
                 return {
@@ -299,6 +333,33 @@ class AbandonedCartAgentService:
                     "payload": None,
                 }
 
+        except Exception as e:
+            print(f"❌ Error creating payload: {str(e)}")
+            return {
+                "success": False,
+                "message": f"Error creating payload: {str(e)}",
+                "payload": None,
+                "agent_id": agent_id,
+            }
+
+        return await self.create_abandoned_cart_payload_from(agent_info)
+
+    async def create_abandoned_cart_payload_from(
+        self, agent_info: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Create complete payload for an agent already returned by get_abandoned_cart_agents
+
+        Args:
+            agent_info: Abandoned cart agent data
+
+        Returns:
+            Dict containing complete payload for external API
+        """
+        agent_id = agent_info["agent_id"]
+        try:
+            print(f"📦 Creating abandoned cart payload for agent {agent_id}")
+
             # Get integration data for all platforms
             integrations = agent_info.get("integrations", {})
             platform_data = {}
@@ -307,8 +368,8 @@ class AbandonedCartAgentService:
                 if integration_data.get("enabled", False):
                     print(f"   Fetching data from {provider_slug}...")
 
-                    cart_data_result = await self.fetch_abandoned_cart_data(
-                        agent_id, provider_slug
+                    cart_data_result = self._fetch_abandoned_cart_data_for(
+                        agent_info, provider_slug
                     )
 
                     if cart_data_result["success"]:
@@ -417,8 +478,6 @@ class AbandonedCartAgentService:
             Dict containing API response results
         """
         try:
-            import httpx
-
             headers = {
                 "Content-Type": "application/json",
                 "User-Agent": "AbandonedCartAgent/1.0",
@@ -429,24 +488,21 @@ class AbandonedCartAgentService:
 
             print(f"📤 Sending payload to external API: {api_url}")
 
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    api_url, json=payload, headers=headers, timeout=30.0
-                )
+            response = await self.http.post(api_url, json=payload, headers=headers)
 
-                return {
-                    "success": response.status_code < 400,
-                    "status_code": response.status_code,
-                    "response_data": (
-                        response.json()
-                        if response.headers.get("content-type", "").startswith(
-                            "application/json"
-                        )
-                        else response.text
-                    ),
-                    "message": f"API request completed with status {response.status_code}",
-                    "api_url": api_url,
-                }
+            return {
+                "success": response.status_code < 400,
+                "status_code": response.status_code,
+                "response_data": (
+                    response.json()
+                    if response.headers.get("content-type", "").startswith(
+                        "application/json"
+                    )
+                    else response.text
+                ),
+                "message": f"API request completed with status {response.status_code}",
+                "api_url": api_url,
+            }
 
         except httpx.TimeoutException:
             return {
@@ -3,10 +3,26 @@ Simplified Agent Integration Service
 Service for fetching agent and integration data from the database
 """
 
+import asyncio
 from typing import List, Dict, Any, Optional
-from src.core.database import supabase
+from src.core.database import supabase, execute_query
 import json
 
+# company_agents columns read by _fetch_complete_agent_data
+AGENT_COLUMNS = (
+    "id, company_id, agent_template_id, selected_voice_id, custom_name, language, "
+    "is_configured, total_interactions, total_minutes_used, last_used_at, "
+    "created_at, activated_at, configuration"
+)
+
+# Agent integration links with their configuration and provider embedded
+AGENT_INTEGRATION_LINKS_SELECT = (
+    "is_enabled,permissions,"
+    "company_integration_configurations("
+    "webhook_url,sync_status,last_sync_at,configuration_name,is_default,"
+    "integration_providers(slug,name,provider_type,auth_type,webhook_support))"
+)
+
 
 class AgentIntegrationService:
     """Service for managing agent integrations"""
@@ -23,11 +39,10 @@ class AgentIntegrationService:
             print("🔍 Fetching company agents...")
 
             # First, get all active agents
-            agents_response = (
+            agents_response = await execute_query(
                 self.client.table("company_agents")
-                .select("*")
+                .select(AGENT_COLUMNS)
                 .eq("is_active", True)
-                .execute()
             )
 
             if not agents_response.data:
@@ -49,7 +64,7 @@ class AgentIntegrationService:
 
         except Exception as e:
             print(f"❌ Error fetching agents with integrations: {str(e)}")
-            return []
+            raise
 
     async def _fetch_complete_agent_data(
         self, agent_data: Dict[str, Any]
@@ -61,19 +76,19 @@ class AgentIntegrationService:
         company_id = agent_data["company_id"]
         template_id = agent_data["agent_template_id"]
 
-        # Fetch company data
-        company_info = await self._fetch_company_info(company_id)
-
-        # Fetch template data
-        template_info = await self._fetch_template_info(template_id)
-
-        # Fetch voice data if available
-        voice_info = None
-        if agent_data.get("selected_voice_id"):
-            voice_info = await self._fetch_voice_info(agent_data["selected_voice_id"])
+        async def fetch_voice_info() -> Optional[Dict[str, Any]]:
+            # Voice data is only fetched if one is selected
+            if agent_data.get("selected_voice_id"):
+                return await self._fetch_voice_info(agent_data["selected_voice_id"])
+            return None
 
-        # Fetch integrations
-        integrations = await self._fetch_agent_integrations(agent_id)
+        # Company, template, voice and integrations are independent, fetch them together
+        company_info, template_info, voice_info, integrations = await asyncio.gather(
+            self._fetch_company_info(company_id),
+            self._fetch_template_info(template_id),
+            fetch_voice_info(),
+            self._fetch_agent_integrations(agent_id),
+        )
 
         # Format the complete agent data
         formatted_data = {
@@ -101,12 +116,13 @@ class AgentIntegrationService:
     async def _fetch_company_info(self, company_id: str) -> Optional[Dict[str, Any]]:
         """Fetch company information"""
         try:
-            response = (
+            response = await execute_query(
                 self.client.table("company_profile")
-                .select("*")
+                .select(
+                    "id, company_name, business_category, phone_number, website, timezone, address"
+                )
                 .eq("id", company_id)
                 .single()
-                .execute()
             )
             if response.data:
                 return {
@@ -125,12 +141,11 @@ class AgentIntegrationService:
     async def _fetch_template_info(self, template_id: str) -> Optional[Dict[str, Any]]:
         """Fetch agent template information"""
         try:
-            response = (
+            response = await execute_query(
                 self.client.table("agent_templates")
-                .select("*")
+                .select("id, name, slug, agent_type, capabilities, description")
                 .eq("id", template_id)
                 .single()
-                .execute()
             )
             if response.data:
                 return {
@@ -148,12 +163,11 @@ class AgentIntegrationService:
     async def _fetch_voice_info(self, voice_id: str) -> Optional[Dict[str, Any]]:
         """Fetch voice information"""
         try:
-            response = (
+            response = await execute_query(
                 self.client.table("agent_voices")
-                .select("*")
+                .select("id, name, provider, voice_id, language")
                 .eq("id", voice_id)
                 .single()
-                .execute()
             )
             if response.data:
                 return {
@@ -172,60 +186,41 @@ class AgentIntegrationService:
         integrations = {}
 
         try:
-            # Get integration links for this agent
-            links_response = (
+            # Get integration links with their configuration and provider in one query
+            links_response = await execute_query(
                 self.client.table("agent_integration_links")
-                .select("*")
+                .select(AGENT_INTEGRATION_LINKS_SELECT)
                 .eq("agent_id", agent_id)
-                .execute()
             )
 
             if not links_response.data:
                 return integrations
 
             for link in links_response.data:
-                config_id = link["configuration_id"]
-
-                # Get configuration details
-                config_response = (
-                    self.client.table("company_integration_configurations")
-                    .select("*")
-                    .eq("id", config_id)
-                    .single()
-                    .execute()
-                )
-
-                if config_response.data:
-                    config = config_response.data
-                    provider_id = config["provider_id"]
-
-                    # Get provider details
-                    provider_response = (
-                        self.client.table("integration_providers")
-                        .select("*")
-                        .eq("id", provider_id)
-                        .single()
-                        .execute()
-                    )
-
-                    if provider_response.data:
-                        provider = provider_response.data
-                        provider_slug = provider.get("slug", "unknown")
-
-                        integrations[provider_slug] = {
-                            "enabled": link.get("is_enabled", False),
-                            "configuration_reference": f"agent_{agent_id}_provider_{provider_slug}",
-                            "provider_name": provider.get("name"),
-                            "provider_type": provider.get("provider_type"),
-                            "auth_type": provider.get("auth_type"),
-                            "webhook_support": provider.get("webhook_support", False),
-                            "webhook_url": config.get("webhook_url"),
-                            "sync_status": config.get("sync_status"),
-                            "last_sync_at": config.get("last_sync_at"),
-                            "configuration_name": config.get("configuration_name"),
-                            "permissions": link.get("permissions", {}),
-                            "is_default": config.get("is_default", False),
-                        }
+                config = link.get("company_integration_configurations")
+                if not config:
+                    continue
+
+                provider = config.get("integration_providers")
+                if not provider:
+                    continue
+
+                provider_slug = provider.get("slug", "unknown")
+
+                integrations[provider_slug] = {
+                    "enabled": link.get("is_enabled", False),
+                    "configuration_reference": f"agent_{agent_id}_provider_{provider_slug}",
+                    "provider_name": provider.get("name"),
+                    "provider_type": provider.get("provider_type"),
+                    "auth_type": provider.get("auth_type"),
+                    "webhook_support": provider.get("webhook_support", False),
+                    "webhook_url": config.get("webhook_url"),
+                    "sync_status": config.get("sync_status"),
+                    "last_sync_at": config.get("last_sync_at"),
+                    "configuration_name": config.get("configuration_name"),
+                    "permissions": link.get("permissions", {}),
+                    "is_default": config.get("is_default", False),
+                }
 
         except Exception as e:
             print(f"❌ Error fetching integrations for agent {agent_id}: {str(e)}")
@@ -237,12 +232,11 @@ class AgentIntegrationService:
         Fetch integration status for a specific company
         """
         try:
-            response = (
+            response = await execute_query(
                 self.client.table("company_integration_configurations")
-                .select("*")
+                .select("provider_id, sync_status, last_sync_at, is_default")
                 .eq("company_id", company_id)
                 .eq("is_active", True)
-                .execute()
             )
 
             integrations_status = {}
@@ -251,12 +245,11 @@ class AgentIntegrationService:
                     provider_id = config["provider_id"]
 
                     # Get provider details
-                    provider_response = (
+                    provider_response = await execute_query(
                         self.client.table("integration_providers")
-                        .select("*")
+                        .select("slug, name, provider_type")
                         .eq("id", provider_id)
                         .single()
-                        .execute()
                     )
 
                     if provider_response.data: